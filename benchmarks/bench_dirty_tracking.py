@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Queries and time to apply extraction results to a sweep of bookmarks: refetch-and-compare against the
+snapshot taken when the bookmarks were loaded.
+
+Usage: python benchmarks/bench_dirty_tracking.py [--bookmarks N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from djmanhwabookmarks import extractors, models  # noqa: E402
+
+
+def result(bookmark: models.ManhwaBookmark, changed: bool) -> extractors.ExtractorResult:
+    number = int(bookmark.name.split()[1])
+    return extractors.ExtractorResult(
+        url=f'https://example.com/foo{number}', title=f'Foo {number}', chapter_number=number,
+        next_chapter_url=f'https://example.com/foo/{number + 1}' if changed else None)
+
+
+def refetch_and_save(bookmark: models.ManhwaBookmark, extractor_result: extractors.ExtractorResult) -> None:
+    "The previous implementation: compare against a fresh copy and save every field."
+    bookmark.set_extractor_result(extractor_result)
+    old = models.ManhwaBookmark.objects.get(pk=bookmark.pk)
+    if any(getattr(bookmark, field) != getattr(old, field) for field in bookmark.update_tracked_fields):
+        bookmark.save()
+
+
+def snapshot_and_save(bookmark: models.ManhwaBookmark, extractor_result: extractors.ExtractorResult) -> None:
+    bookmark.apply_extractor_result(extractor_result)
+
+
+def measure(apply, count: int, changed_ratio: float) -> tuple[int, float]:
+    changed = int(count * changed_ratio)
+    # the unchanged bookmarks already have the values of their result
+    bookmarks = list(models.ManhwaBookmark.objects.order_by('pk'))
+    for pos, bookmark in enumerate(bookmarks):
+        bookmark.set_extractor_result(result(bookmark, changed=False))
+        if pos < changed:
+            bookmark.next_chapter_url = None
+    models.ManhwaBookmark.objects.bulk_update(bookmarks, bookmarks[0].update_tracked_fields)
+
+    bookmarks = list(models.ManhwaBookmark.objects.order_by('pk'))
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for pos, bookmark in enumerate(bookmarks):
+            apply(bookmark, result(bookmark, changed=pos < changed))
+        elapsed = time.perf_counter() - start
+    return len(queries), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bookmarks', type=int, default=1000)
+    parser.add_argument('--changed', type=float, default=0.1, help='ratio of bookmarks with a new chapter')
+    args = parser.parse_args()
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        models.ManhwaBookmark.objects.bulk_create(
+            models.ManhwaBookmark(name=f'Foo {number}', chapter_url=f'https://example.com/foo/{number}')
+            for number in range(args.bookmarks))
+        for name, apply in (('refetch + full save', refetch_and_save), ('snapshot + update_fields', snapshot_and_save)):
+            queries, elapsed = measure(apply, args.bookmarks, args.changed)
+            print(f'{name}: {queries} queries, {elapsed:.2f}s for {args.bookmarks} bookmarks')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
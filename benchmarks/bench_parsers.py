@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Parse + query time of a chapter page with the BeautifulSoup backend and the lxml backend.
+
+Usage: python benchmarks/bench_parsers.py [--images N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from djmanhwabookmarks import extractors  # noqa: E402
+
+
+SELECTORS = ('span.chapter', 'a.next', 'a.series', 'h1', 'div.summary')
+
+
+def chapter_page(images: int) -> bytes:
+    panels = '\n'.join(
+        f'<div class="panel"><img src="/img/{n}.jpg" alt="panel {n}" loading="lazy"></div>' for n in range(images))
+    return f'''<html><head><title>Foo 12</title></head><body>
+<nav><a class="series" href="/series/foo">Foo</a></nav>
+<h1>Foo</h1><div class="summary">A manhwa about foo.</div>
+<span class="chapter">Chapter 12</span>
+<main>{panels}</main>
+<a class="next" href="/series/foo/13">Next</a>
+</body></html>'''.encode()
+
+
+def run(backend, content: bytes, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        backend.load(content)
+        for selector in SELECTORS:
+            backend.get_text_content(selector)
+        backend.get_attribute('a.next', 'href', required_tag='a')
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=200, help='image panels in the chapter page')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    content = chapter_page(args.images)
+    soup_time = run(extractors.MechanicalSoupExtractorBackend(), content, args.repeat)
+    lxml_time = run(extractors.LXmlXpathExtractorBackend(), content, args.repeat)
+    print(f'page size: {len(content) / 1024:.1f} KiB, {args.repeat} runs')
+    print(f'BeautifulSoup: {soup_time * 1000:.2f} ms/page')
+    print(f'lxml + XPath:  {lxml_time * 1000:.2f} ms/page ({soup_time / lxml_time:.1f}x faster)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Throughput, latency, peak RSS and queries of update_bookmarks sweeps against a local fixture server.
+
+Every backend is swept with 10, 100 and 1000 bookmarks, plus an async sweep of the BeautifulSoup backend.
+Each sweep runs in its own process with a fresh test database, so its peak RSS isn't inflated by the
+previous ones. The results are written to a JSON file, --compare prints the change against a previous one.
+
+Usage: python benchmarks/bench_sweep.py [--sizes 10 100 1000] [--backends mechanical_soup lxml playwright]
+    [--latency SECONDS] [--output results.json] [--compare previous.json]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+
+
+def chapter_page(series: int, chapter: int, images: int) -> bytes:
+    panels = '\n'.join(
+        f'<div class="panel"><img src="/img/{n}.jpg" alt="panel {n}" loading="lazy"></div>' for n in range(images))
+    return f'''<html><head><title>Series {series} {chapter}</title></head><body>
+<nav><a class="series" href="/series/{series}">Series {series}</a></nav>
+<span class="chapter">Chapter {chapter}</span>
+<main>{panels}</main>
+<a class="next" href="/series/{series}/{chapter + 1}">Next</a>
+</body></html>'''.encode()
+
+
+def series_page(series: int) -> bytes:
+    chapters = '\n'.join(f'<li><a href="/series/{series}/{n}">Chapter {n}</a></li>' for n in range(1, 101))
+    return f'''<html><head><title>Series {series}</title></head><body>
+<h1>Series {series}</h1><div class="summary">The story of series {series}.</div>
+<ul class="chapters">{chapters}</ul>
+</body></html>'''.encode()
+
+
+class FixturesHandler(BaseHTTPRequestHandler):
+    "Serves /series/<n> and /series/<n>/<chapter>, every response is delayed by the server `latency`."
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        if len(parts) not in (2, 3) or parts[0] != 'series' or not all(part.isdigit() for part in parts[1:]):
+            self.send_error(404)
+            return
+        time.sleep(self.server.latency)
+        if len(parts) == 3:
+            body = chapter_page(int(parts[1]), int(parts[2]), self.server.images)
+        else:
+            body = series_page(int(parts[1]))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(latency: float, images: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixturesHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.images = images
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(values: list[float], percent: int) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run_scenario(scenario: dict, base_url: str, concurrency: int) -> dict:
+    "Runs one sweep in this process and returns its results."
+    import django
+
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from djmanhwabookmarks import crawler, models, signals
+
+    latencies: list[float] = []
+    errors: list[str] = []
+
+    def timed(sender, bookmark, timings, **kwargs):
+        latencies.append(timings.total_seconds)
+        if timings.error:
+            errors.append(timings.error)
+
+    signals.bookmark_timed.connect(timed, weak=False)
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        models.ManhwaBookmark.objects.bulk_create(
+            models.ManhwaBookmark(
+                name=f'Series {number}', chapter_url=f'{base_url}/series/{number}/1',
+                extractor_type=scenario['backend'], host=models.normalize_host(base_url),
+                chapter_number_selector='span.chapter', chapter_number_regex=r'(\d+)',
+                next_chapter_url_selector='a.next', url_selector='a.series',
+                title_selector='h1', description_selector='div.summary')
+            for number in range(scenario['bookmarks']))
+        # every bookmark is on the same host, the politeness limits would measure the scheduler
+        scheduler = crawler.HostScheduler(concurrency=concurrency)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            stats = models.ManhwaBookmark.objects.all().update_bookmarks(
+                use_async=scenario['crawler'] == 'async', concurrency=concurrency, scheduler=scheduler)
+            elapsed = time.perf_counter() - start
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    return {
+        **scenario,
+        'processed': stats.processed,
+        'updated': stats.updated,
+        'errors': stats.errors,
+        'error': errors[0] if errors else None,
+        'elapsed': elapsed,
+        'bookmarks_per_second': stats.processed / elapsed if elapsed else 0.0,
+        'latency_p50': percentile(latencies, 50),
+        'latency_p95': percentile(latencies, 95),
+        'peak_rss_mb': peak_rss_mb(),
+        'queries': len(queries),
+    }
+
+
+def scenario_name(result: dict) -> str:
+    return f'{result["backend"]}/{result["crawler"]}/{result["bookmarks"]}'
+
+
+def format_result(result: dict) -> str:
+    if result.get('failed'):
+        return f'{scenario_name(result)}: failed, {result["failed"]}'
+    line = (
+        f'{scenario_name(result)}: {result["bookmarks_per_second"]:.1f} bookmarks/s, '
+        f'p50 {result["latency_p50"] * 1000:.1f} ms, p95 {result["latency_p95"] * 1000:.1f} ms, '
+        f'{result["peak_rss_mb"]:.0f} MB peak RSS, {result["queries"]} queries'
+    )
+    if result['errors']:
+        # the error is a repr, only its first line is shown
+        error = result['error'].split('\\n')[0]
+        line += f', {result["errors"]} errors ({error})'
+    return line
+
+
+def compare(results: list[dict], previous: list[dict]) -> list[str]:
+    "Relative change of every metric against the same scenario of a previous run."
+    previous_by_name = {scenario_name(result): result for result in previous if not result.get('failed')}
+    lines = []
+    for result in results:
+        old = previous_by_name.get(scenario_name(result))
+        if old is None or result.get('failed'):
+            continue
+        changes = []
+        for key in ('bookmarks_per_second', 'latency_p50', 'latency_p95', 'peak_rss_mb', 'queries'):
+            if old[key]:
+                changes.append(f'{key} {(result[key] - old[key]) / old[key]:+.1%}')
+        lines.append(f'{scenario_name(result)}: {", ".join(changes)}')
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='bookmarks per sweep')
+    parser.add_argument('--backends', nargs='+', default=['mechanical_soup', 'lxml', 'playwright'])
+    parser.add_argument('--concurrency', type=int, default=10, help='worker threads of the sweeps')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds the server waits before answering')
+    parser.add_argument('--images', type=int, default=200, help='image panels in the chapter pages')
+    parser.add_argument('--output', default='bench_sweep.json')
+    parser.add_argument('--compare', help='results of a previous run')
+    # internal: runs a single scenario and prints its results
+    parser.add_argument('--scenario', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        print(json.dumps(run_scenario(json.loads(args.scenario), args.base_url, args.concurrency)))
+        return
+
+    scenarios = [{'backend': backend, 'crawler': 'threads', 'bookmarks': size}
+        for backend in args.backends for size in args.sizes]
+    if 'mechanical_soup' in args.backends:
+        scenarios += [{'backend': 'mechanical_soup', 'crawler': 'async', 'bookmarks': size} for size in args.sizes]
+
+    server = start_server(args.latency, args.images)
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    results = []
+    try:
+        for scenario in scenarios:
+            process = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--scenario', json.dumps(scenario),
+                    '--base-url', base_url, '--concurrency', str(args.concurrency)],
+                capture_output=True, text=True, cwd=ROOT)
+            if process.returncode:
+                result = {**scenario, 'failed': (process.stderr.strip().splitlines() or ['no output'])[-1]}
+            else:
+                result = json.loads(process.stdout.splitlines()[-1])
+            results.append(result)
+            print(format_result(result))
+    finally:
+        server.shutdown()
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'latency': args.latency,
+        'images': args.images,
+        'concurrency': args.concurrency,
+        'results': results,
+    }
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+    print(f'Results written to {args.output}')
+    if args.compare:
+        with open(args.compare) as previous:
+            for line in compare(results, json.load(previous)['results']):
+                print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -27,10 +27,11 @@ class ManhwaBookmarkAdmin(admin.ModelAdmin):
 
     actions = ('update_bookmarks',)
     list_display = ('get_name', 'get_chapter_number', 'is_template', 'bookmark_buttons', 'priority', 'priority_multiplier', 'get_updated_at')
-    readonly_fields = ('url', 'title', 'description', 'chapter_number', 'next_chapter_url', 'priority', 'get_updated_at')
+    readonly_fields = ('url', 'title', 'description', 'chapter_number', 'next_chapter_url', 'priority',
+        'get_updated_at', 'next_chapter_detected_at', 'release_interval', 'next_check_at')
     fieldsets = (
         (None, {
-            'fields': ('name', 'extractor_type')
+            'fields': ('name', 'extractor_type', 'page_ready_timeout', 'allowed_resource_types')
         }),
         (_('Main info'), {
             'fields': ('url', 'url_selector', 'title', 'title_selector', 'description', 'description_selector')
@@ -51,7 +52,7 @@ class ManhwaBookmarkAdmin(admin.ModelAdmin):
             'fields': ('priority', 'priority_multiplier')
         }),
         (_('Dates'), {
-            'fields': ('get_updated_at',)
+            'fields': ('get_updated_at', 'next_chapter_detected_at', 'release_interval', 'next_check_at')
         }),
     )
     form = forms.BookmarkForm
@@ -89,12 +90,18 @@ class ManhwaBookmarkAdmin(admin.ModelAdmin):
 
     @admin.action(description=_('Update bookmarks'))
     def update_bookmarks(self, request, queryset: models.ManhwaBookmarkQueryset):
-        queryset.update_bookmarks()
-        self.message_user(request, gettext('Bookmarks updated'))
+        # the update runs in the process_update_jobs command, its progress is polled from the change list
+        job = models.UpdateJob.objects.enqueue(queryset)
+        self.message_user(request, gettext('Update of the bookmarks queued as %(job)s') % {'job': job})
 
     def get_urls(self):
         url = super().get_urls()
         custom_urls = [
+            path(
+                'update-jobs/',
+                self.admin_site.admin_view(self.update_jobs),
+                name='bookmark-update-jobs'
+            ),
             path(
                 '<int:bookmark_id>/bookmark-actions/',
                 self.admin_site.admin_view(self.bookmark_actions),
@@ -117,6 +124,16 @@ class ManhwaBookmarkAdmin(admin.ModelAdmin):
         context = {'bookmark': bookmark}
         return render(request, 'djmanhwabookmarks/bookmark_actions_response.html', context)
 
+    def update_jobs(self, request, *args, **kwargs):
+        active_jobs = list(models.UpdateJob.objects.active().order_by('pk'))
+        finished_jobs = models.UpdateJob.objects.exclude(pk__in=[job.pk for job in active_jobs])[:3]
+        context = {'active_jobs': active_jobs, 'finished_jobs': finished_jobs}
+        response = render(request, 'djmanhwabookmarks/update_jobs.html', context)
+        if not active_jobs:
+            # htmx stops polling
+            response.status_code = 286
+        return response
+
     def bookmark_actions(self, request, bookmark_id, *args, **kwargs):
         bookmark = get_object_or_404(models.ManhwaBookmark, pk=bookmark_id)
         return self.render_bookmark_actions_response(request, bookmark)
@@ -136,3 +153,12 @@ class ManhwaBookmarkAdmin(admin.ModelAdmin):
         bookmark = get_object_or_404(models.ManhwaBookmark, pk=bookmark_id)
         bookmark.change_to_next_chapter()
         return self.render_bookmark_actions_response(request, bookmark)
+
+
+@admin.register(models.UpdateJob)
+class UpdateJobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'total', 'processed', 'updated', 'errors', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('status', 'total', 'processed', 'updated', 'errors', 'error', 'created_at', 'started_at',
+        'finished_at')
+    raw_id_fields = ('bookmarks',)
@@ -0,0 +1,145 @@
+from typing import Iterator, Mapping
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .caches import normalize_url
+
+
+MAGIC = b'MHBARC01'
+# offset and length of the index, followed by the magic
+FOOTER = struct.Struct('<QQ8s')
+
+
+@dataclass
+class ArchivedResponse:
+    "A recorded response, with the attributes of a `requests.Response` the backends use."
+    url: str
+    status_code: int
+    headers: CaseInsensitiveDict
+    content: bytes
+
+    @property
+    def encoding(self) -> str | None:
+        return get_encoding_from_headers(self.headers)
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+
+class ArchiveWriter:
+    """
+    Writes responses to an archive file: the zlib compressed bodies one after the other, then a compressed
+    JSON index by normalized url, then a footer with the position of the index. The index is only written
+    by `close`, an archive that wasn't closed can't be read. A url recorded twice keeps the last response.
+    """
+    path: str
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._index: dict[str, dict] = {}
+
+    def add(self, url: str, status_code: int, headers: Mapping[str, str], content: bytes) -> None:
+        blob = zlib.compress(content)
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(blob)
+            self._index[normalize_url(url)] = {
+                'url': url, 'status': status_code, 'headers': dict(headers), 'offset': offset, 'length': len(blob)}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            index = zlib.compress(json.dumps(self._index).encode())
+            offset = self._file.tell()
+            self._file.write(index)
+            self._file.write(FOOTER.pack(offset, len(index), MAGIC))
+            self._file.close()
+
+    def __len__(self):
+        return len(self._index)
+
+
+class ResponseArchive:
+    "Read-only view of an archive written by ArchiveWriter. The file is memory-mapped, bodies are read on demand."
+    path: str
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as archive_file:
+            size = os.fstat(archive_file.fileno()).st_size
+            if size < len(MAGIC) + FOOTER.size:
+                raise ValueError(f'{path} is not a response archive.')
+            self._mmap = mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+        offset, length, magic = FOOTER.unpack(self._mmap[-FOOTER.size:])
+        if self._mmap[:len(MAGIC)] != MAGIC or magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f'{path} is not a response archive, or it was not closed.')
+        self._index: dict[str, dict] = json.loads(zlib.decompress(self._mmap[offset:offset + length]))
+
+    def get(self, url: str) -> ArchivedResponse | None:
+        entry = self._index.get(normalize_url(url))
+        if entry is None:
+            return None
+        content = zlib.decompress(self._mmap[entry['offset']:entry['offset'] + entry['length']])
+        return ArchivedResponse(entry['url'], entry['status'], CaseInsensitiveDict(entry['headers']), content)
+
+    def urls(self) -> list[str]:
+        return [entry['url'] for entry in self._index.values()]
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __contains__(self, url: str) -> bool:
+        return normalize_url(url) in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+
+class ArchiveMode:
+    """
+    Archive of the sweeps of this process. While `record` is active every downloaded page is written to the
+    archive, while `replay` is active the pages are read from it instead of the network.
+    """
+    writer: ArchiveWriter | None
+    archive: ResponseArchive | None
+
+    def __init__(self):
+        self.writer = None
+        self.archive = None
+
+    @contextmanager
+    def record(self, path: str) -> Iterator[ArchiveWriter]:
+        self.writer = ArchiveWriter(path)
+        try:
+            yield self.writer
+        finally:
+            writer, self.writer = self.writer, None
+            writer.close()
+
+    @contextmanager
+    def replay(self, archive: ResponseArchive) -> Iterator[ResponseArchive]:
+        "The archive is closed at the end of the block."
+        self.archive = archive
+        try:
+            yield archive
+        finally:
+            archive, self.archive = self.archive, None
+            archive.close()
+
+
+archive_mode = ArchiveMode()
@@ -0,0 +1,187 @@
+from typing import Iterator
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+from playwright.sync_api import Browser, Page, Playwright, sync_playwright, Error as PlaywrightError
+
+from .conf import app_settings
+
+
+@dataclass
+class HostReadiness:
+    waits: int = 0
+    timeouts: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def average_seconds(self) -> float:
+        return self.total_seconds / self.waits if self.waits else 0.0
+
+
+class ReadinessStats:
+    "Time spent waiting for rendered pages to be ready, by host, to tune the timeouts of slow sites."
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: defaultdict[str, HostReadiness] = defaultdict(HostReadiness)
+
+    def record(self, url: str, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            host = self._hosts[urlparse(url).netloc]
+            host.waits += 1
+            host.timeouts += int(timed_out)
+            host.total_seconds += seconds
+            host.max_seconds = max(host.max_seconds, seconds)
+
+    def hosts(self) -> dict[str, HostReadiness]:
+        with self._lock:
+            return {host: HostReadiness(**vars(readiness)) for host, readiness in self._hosts.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+    def __str__(self):
+        return '\n'.join(
+            f'{host}: {readiness.waits} waits, {readiness.timeouts} timeouts, '
+            f'avg {readiness.average_seconds:.2f}s, max {readiness.max_seconds:.2f}s'
+            for host, readiness in sorted(self.hosts().items())
+        )
+
+
+class ResourceBlockingStats:
+    "Requests aborted in rendered pages by resource type, with an estimation of the bytes not downloaded."
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocked: defaultdict[str, int] = defaultdict(int)
+
+    def record(self, resource_type: str) -> None:
+        with self._lock:
+            self._blocked[resource_type] += 1
+
+    def blocked(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._blocked)
+
+    def estimated_bytes_saved(self) -> int:
+        estimates = app_settings.PLAYWRIGHT_RESOURCE_SIZE_ESTIMATES
+        return sum(count * estimates.get(resource_type, 0) for resource_type, count in self.blocked().items())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._blocked.clear()
+
+    def __str__(self):
+        blocked = ', '.join(f'{count} {resource_type}' for resource_type, count in sorted(self.blocked().items()))
+        return f'Blocked requests: {blocked or "none"} (~{self.estimated_bytes_saved() / 1_000_000:.1f} MB saved)'
+
+
+class BrowserManager:
+    """
+    Chromium browser of one thread. The playwright sync api is bound to the thread that started it,
+    so a manager must only be used from the thread that created it.
+
+    Every page gets a fresh browser context. The browser is relaunched after `max_pages` pages or when it
+    disconnects.
+    """
+    max_pages: int
+    playwright: Playwright | None
+    browser: Browser | None
+    pages_opened: int
+    launches: int
+
+    def __init__(self, max_pages: int):
+        self.max_pages = max_pages
+        self.playwright = None
+        self.browser = None
+        self.pages_opened = 0
+        self.launches = 0
+
+    def get_browser(self) -> Browser:
+        if self.browser is not None and (self.pages_opened >= self.max_pages or not self.browser.is_connected()):
+            self.close_browser()
+        if self.browser is None:
+            if self.playwright is None:
+                self.playwright = sync_playwright().start()
+            self.browser = self.playwright.chromium.launch()
+            self.pages_opened = 0
+            self.launches += 1
+        return self.browser
+
+    @contextmanager
+    def page(self) -> Iterator[Page]:
+        browser = self.get_browser()
+        context = browser.new_context()
+        self.pages_opened += 1
+        try:
+            yield context.new_page()
+        finally:
+            try:
+                context.close()
+            except PlaywrightError:
+                # the browser crashed, it is relaunched for the next page
+                self.close_browser()
+
+    def close_browser(self) -> None:
+        if self.browser is None:
+            return
+        try:
+            self.browser.close()
+        except PlaywrightError:
+            ...
+        self.browser = None
+
+    def close(self) -> None:
+        self.close_browser()
+        if self.playwright is not None:
+            self.playwright.stop()
+            self.playwright = None
+
+
+class BrowserPool:
+    """
+    Process wide pool with one BrowserManager per thread. Only the threads that enabled it use the pool,
+    they must close it once they are done, a browser left open by other threads would never be closed.
+    """
+    max_pages_per_browser: int | None
+
+    def __init__(self, max_pages_per_browser: int | None = None):
+        self.max_pages_per_browser = max_pages_per_browser
+        self._local = threading.local()
+
+    def get_manager(self) -> BrowserManager:
+        manager = getattr(self._local, 'manager', None)
+        if manager is None:
+            max_pages = self.max_pages_per_browser or app_settings.PLAYWRIGHT_PAGES_PER_BROWSER
+            manager = self._local.manager = BrowserManager(max_pages)
+        return manager
+
+    @contextmanager
+    def page(self) -> Iterator[Page]:
+        with self.get_manager().page() as page:
+            yield page
+
+    def enable_current_thread(self) -> None:
+        self._local.enabled = True
+
+    def is_enabled(self) -> bool:
+        "Whether the calling thread uses the pool."
+        return getattr(self._local, 'enabled', False)
+
+    def close_current_thread(self) -> None:
+        "Closes the browser of the calling thread. Must be called by every worker thread once it's done."
+        self._local.enabled = False
+        manager = getattr(self._local, 'manager', None)
+        if manager is not None:
+            manager.close()
+            self._local.manager = None
+
+
+browser_pool = BrowserPool()
+readiness_stats = ReadinessStats()
+resource_blocking_stats = ResourceBlockingStats()
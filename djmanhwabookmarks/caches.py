@@ -0,0 +1,217 @@
+from typing import TYPE_CHECKING, Iterable, Iterator
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache, _CacheInfo
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+import requests
+
+import soupsieve
+from cssselect import HTMLTranslator
+from lxml import etree
+
+from django.apps import apps
+
+from .conf import app_settings
+
+if TYPE_CHECKING:
+    from .models import ManhwaBookmark
+
+
+# maximum number of compiled patterns kept by each cache
+CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_css(selector: str) -> soupsieve.SoupSieve:
+    return soupsieve.compile(selector)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_regex(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
+def is_xpath_selector(selector: str) -> bool:
+    return selector.startswith(('/', './', '('))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_xpath(selector: str) -> etree.XPath:
+    "Compiles an XPath selector, CSS selectors are translated to XPath first."
+    if is_xpath_selector(selector):
+        return etree.XPath(selector)
+    return etree.XPath(HTMLTranslator().css_to_xpath(selector))
+
+
+class TemplateCache:
+    """
+    Bookmark templates by host. Every template is loaded with one query on the first lookup and kept until
+    the cache is cleared, which happens when a template is saved or deleted in this process, or until
+    MANHWABOOKMARKS_TEMPLATE_CACHE_TTL seconds passed, for the templates edited by other processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._templates: dict[str, 'ManhwaBookmark'] | None = None
+        self._template_pks: frozenset[int] = frozenset()
+        self._loaded_at = 0.0
+        self._hits = 0
+        self._misses = 0
+
+    def load(self) -> dict[str, 'ManhwaBookmark']:
+        templates: dict[str, 'ManhwaBookmark'] = {}
+        # with several templates for a host the first one in the default ordering is used
+        for template in apps.get_model('djmanhwabookmarks', 'ManhwaBookmark').objects.filter(is_template=True):
+            templates.setdefault(template.host, template)
+        return templates
+
+    def get(self, host: str) -> 'ManhwaBookmark | None':
+        with self._lock:
+            if self._templates is None or time.monotonic() - self._loaded_at >= app_settings.TEMPLATE_CACHE_TTL:
+                self._misses += 1
+                self._templates = self.load()
+                self._loaded_at = time.monotonic()
+                self._template_pks = frozenset(template.pk for template in self._templates.values())
+            else:
+                self._hits += 1
+            return self._templates.get(host)
+
+    def get_many(self, hosts: Iterable[str]) -> dict[str, 'ManhwaBookmark']:
+        return {host: template for host in set(hosts) if (template := self.get(host)) is not None}
+
+    def is_cached(self, bookmark: 'ManhwaBookmark') -> bool:
+        return bookmark.pk in self._template_pks
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates = None
+            self._template_pks = frozenset()
+
+    def cache_info(self) -> _CacheInfo:
+        with self._lock:
+            return _CacheInfo(self._hits, self._misses, None, len(self._templates or ()))
+
+
+def normalize_url(url: str) -> str:
+    "Url without fragment, default port or case differences in the scheme and host."
+    parts = urlsplit(url)
+    scheme, netloc = parts.scheme.lower(), parts.netloc.lower()
+    if (scheme, parts.port) in (('http', 80), ('https', 443)):
+        netloc = netloc.rsplit(':', 1)[0]
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+
+class ResponseCache:
+    """
+    Pages downloaded during a crawl by normalized url, so a page fetched by several bookmarks, or that is the
+    chapter and the series page of the same bookmark, is downloaded once per crawl. Pages are only kept
+    inside `sweep()` and are dropped when it ends. At most `maxsize` pages are kept, by default the
+    MANHWABOOKMARKS_RESPONSE_CACHE_SIZE setting, the least recently used are dropped first.
+    """
+    maxsize: int | None
+
+    def __init__(self, maxsize: int | None = None):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._responses: OrderedDict[str, requests.Response | httpx.Response] = OrderedDict()
+        self._sweeps = 0
+        self._hits = 0
+        self._misses = 0
+
+    def get_maxsize(self) -> int:
+        return self.maxsize or app_settings.RESPONSE_CACHE_SIZE
+
+    @contextmanager
+    def sweep(self) -> Iterator['ResponseCache']:
+        "Enables the cache until the outermost sweep ends. The counters are reset when it starts."
+        with self._lock:
+            if not self._sweeps:
+                self._hits = self._misses = 0
+            self._sweeps += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._sweeps -= 1
+                if not self._sweeps:
+                    self._responses.clear()
+
+    def get(self, url: str) -> requests.Response | httpx.Response | None:
+        with self._lock:
+            if not self._sweeps:
+                return None
+            key = normalize_url(url)
+            response = self._responses.get(key)
+            if response is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._responses.move_to_end(key)
+            return response
+
+    def put(self, url: str, response: requests.Response | httpx.Response) -> None:
+        "Keeps full responses only, a 304 answers the conditional headers of one bookmark."
+        if response.status_code != 200:
+            return
+        with self._lock:
+            if not self._sweeps:
+                return
+            key = normalize_url(url)
+            self._responses[key] = response
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.get_maxsize():
+                self._responses.popitem(last=False)
+
+    def dedup_ratio(self) -> float:
+        "Fraction of the pages requested during the last sweep that weren't downloaded again."
+        with self._lock:
+            lookups = self._hits + self._misses
+            return self._hits / lookups if lookups else 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._responses.clear()
+            self._hits = self._misses = 0
+
+    def cache_info(self) -> _CacheInfo:
+        with self._lock:
+            return _CacheInfo(self._hits, self._misses, self.get_maxsize(), len(self._responses))
+
+    def __str__(self):
+        info = self.cache_info()
+        return (f'{info.hits} of {info.hits + info.misses} pages served from the response cache '
+            f'({self.dedup_ratio():.1%} deduplicated)')
+
+
+template_cache = TemplateCache()
+response_cache = ResponseCache()
+
+
+def cache_stats() -> dict[str, _CacheInfo]:
+    return {
+        'css': compile_css.cache_info(),
+        'regex': compile_regex.cache_info(),
+        'xpath': compile_xpath.cache_info(),
+        'templates': template_cache.cache_info(),
+        'responses': response_cache.cache_info(),
+    }
+
+
+def format_cache_stats() -> str:
+    return ', '.join(
+        f'{name}: {info.hits} hits, {info.misses} misses, {info.currsize}/{info.maxsize or "-"} cached'
+        for name, info in cache_stats().items()
+    )
+
+
+def clear_caches() -> None:
+    compile_css.cache_clear()
+    compile_regex.cache_clear()
+    compile_xpath.cache_clear()
+    template_cache.clear()
+    response_cache.clear()
@@ -0,0 +1,48 @@
+from typing import Any
+
+from django.conf import settings
+
+
+class AppSettings:
+    "Application settings, read from the django settings with the MANHWABOOKMARKS_ prefix."
+    prefix = 'MANHWABOOKMARKS_'
+    defaults: dict[str, Any] = {
+        # maximum number of bookmarks of the same host updated at the same time
+        'HOST_CONCURRENCY': 4,
+        # maximum number of bookmark updates started per second on the same host, None for no limit
+        'HOST_RATE': None,
+        # per host overrides: {'example.com': {'concurrency': 1, 'rate': 0.5}}
+        'HOST_LIMITS': {},
+        # bookmarks written per query at the end of a crawl
+        'BULK_UPDATE_BATCH_SIZE': 100,
+        # bookmarks fetched per query by update_bookmarks
+        'CRAWL_CHUNK_SIZE': 500,
+        # pages kept by the response cache during a crawl, so pages shared by bookmarks are downloaded once
+        'RESPONSE_CACHE_SIZE': 256,
+        # seconds before the series page of a bookmark is fetched again to refresh its title and description
+        'MAIN_PAGE_TTL': 7 * 24 * 60 * 60,
+        # seconds the templates are cached, the edits made by other processes are seen after at most this delay
+        'TEMPLATE_CACHE_TTL': 60,
+        # seconds between the checks of a bookmark, at least MIN and at most MAX
+        'MIN_CHECK_INTERVAL': 60 * 60,
+        'MAX_CHECK_INTERVAL': 30 * 24 * 60 * 60,
+        # checks of a bookmark per estimated release interval of its series
+        'CHECKS_PER_RELEASE': 4,
+        # pages opened by a playwright browser before it is relaunched
+        'PLAYWRIGHT_PAGES_PER_BROWSER': 100,
+        # average size of the resources blocked in rendered pages, used to estimate the bytes saved
+        'PLAYWRIGHT_RESOURCE_SIZE_ESTIMATES': {
+            'image': 300_000,
+            'media': 2_000_000,
+            'font': 50_000,
+            'stylesheet': 30_000,
+        },
+    }
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in self.defaults:
+            raise AttributeError(name)
+        return getattr(settings, self.prefix + name, self.defaults[name])
+
+
+app_settings = AppSettings()
@@ -0,0 +1,545 @@
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, AsyncIterator
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from collections import defaultdict, deque
+from itertools import islice
+from contextlib import contextmanager, asynccontextmanager
+from dataclasses import dataclass, asdict, field
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+
+import httpx
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import metrics
+from .conf import app_settings
+from .browsers import browser_pool
+from .extractors import ExtractorResult
+
+if TYPE_CHECKING:
+    from .models import ManhwaBookmark
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CrawlStats:
+    total: int = 0
+    processed: int = 0
+    updated: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    # lines about the resources of the sweep (connections, caches, slowest hosts), written by the commands
+    report: list[str] = field(default_factory=list)
+
+    @property
+    def bookmarks_per_second(self) -> float:
+        if not self.elapsed:
+            return 0.0
+        return self.processed / self.elapsed
+
+    def as_dict(self) -> dict[str, int | float]:
+        values = asdict(self)
+        del values['report']
+        return {**values, 'bookmarks_per_second': self.bookmarks_per_second}
+
+    def __str__(self):
+        return (
+            f'{self.processed}/{self.total} bookmarks processed, {self.updated} updated, {self.errors} errors '
+            f'in {self.elapsed:.2f}s ({self.bookmarks_per_second:.2f} bookmarks/s)'
+        )
+
+
+ProgressCallback = Callable[[CrawlStats], None]
+
+
+class ProgressReporter:
+    "Sends the stats of a running crawl to `callback`, at most once every `interval` seconds."
+    callback: ProgressCallback | None
+    interval: float
+
+    def __init__(self, callback: ProgressCallback | None, interval: float = 1.0):
+        self.callback = callback
+        self.interval = interval
+        self._last_report: float | None = None
+
+    def due(self) -> bool:
+        "Whether a report is due. After it returns True the next report is due in `interval` seconds."
+        if self.callback is None:
+            return False
+        now = time.monotonic()
+        if self._last_report is not None and now - self._last_report < self.interval:
+            return False
+        self._last_report = now
+        return True
+
+    def report(self, stats: CrawlStats) -> None:
+        if self.callback is not None:
+            self.callback(stats)
+
+
+class BulkWriter:
+    """
+    Collects the bookmarks changed by a crawl and writes them with `bulk_update`, `batch_size` rows per
+    query and only the fields that changed.
+
+    The extraction results are compared against the values the bookmarks were loaded with, so no query is
+    needed to know if a bookmark changed. Unchanged bookmarks, and the ones whose update failed, only write
+    their next check. Bookmarks are grouped by the fields they changed, a deferred field that wasn't set
+    would be loaded with one query per bookmark.
+
+    The timings given with a bookmark get the compare time and their share of the bulk update, they are
+    recorded once the bookmark is written.
+
+    When a batch conflicts with a unique constraint, like two series with the same next chapter url, its
+    bookmarks are written one by one and only the conflicting ones fail. Their next check is still written,
+    they back off like the bookmarks whose update failed.
+    """
+    batch_size: int
+    # bookmarks written, the ones among them that changed more than their next check and the ones that failed
+    written: int
+    updated: int
+    failed: int
+
+    def __init__(self, batch_size: int | None = None):
+        self.batch_size = batch_size or app_settings.BULK_UPDATE_BATCH_SIZE
+        self.written = 0
+        self.updated = 0
+        self.failed = 0
+        self._pending: list[tuple['ManhwaBookmark', set[str]]] = []
+        self._timings: dict['ManhwaBookmark', metrics.BookmarkTimings] = {}
+        # schedule fields of the added bookmarks before their check, restored if their write fails
+        self._schedules: dict['ManhwaBookmark', dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._unreported_failures = 0
+
+    def add(self, bookmark: 'ManhwaBookmark', result: ExtractorResult,
+            timings: metrics.BookmarkTimings | None = None) -> bool:
+        """
+        Returns whether the bookmark changed. The next check of the bookmark is scheduled and written even if
+        it didn't change.
+        """
+        with metrics.collect(timings), metrics.phase('compare'):
+            had_next_chapter = bookmark.next_chapter_url is not None
+            changed_fields = bookmark.set_extractor_result(result)
+            self._schedules[bookmark] = {name: getattr(bookmark, name) for name in bookmark.schedule_fields}
+            bookmark.schedule_next_check(new_chapter=not had_next_chapter and bookmark.next_chapter_url is not None)
+            fields = set(bookmark.schedule_fields)
+            if changed_fields:
+                bookmark.update_priority()
+                bookmark.updated_at = timezone.now()
+                fields |= changed_fields | {'priority', 'updated_at'}
+        self._pending.append((bookmark, fields))
+        if timings is not None:
+            self._timings[bookmark] = timings
+        return bool(changed_fields)
+
+    def add_failed(self, bookmark: 'ManhwaBookmark') -> None:
+        "Schedules the next check of a bookmark whose update failed, it backs off like the unchanged checks."
+        bookmark.schedule_next_check(new_chapter=False)
+        self._pending.append((bookmark, set(bookmark.schedule_fields)))
+
+    def take_batch(self, force: bool = False) -> list[tuple['ManhwaBookmark', set[str]]]:
+        "Returns the pending bookmarks when there is a full batch, or any pending bookmark with `force`."
+        if not self._pending or (len(self._pending) < self.batch_size and not force):
+            return []
+        batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+        return batch
+
+    def write(self, batch: list[tuple['ManhwaBookmark', set[str]]]) -> None:
+        if not batch:
+            return
+        groups: defaultdict[frozenset[str], list['ManhwaBookmark']] = defaultdict(list)
+        for bookmark, changed_fields in batch:
+            groups[frozenset(changed_fields)].append(bookmark)
+        for fields, bookmarks in groups.items():
+            start = time.perf_counter()
+            failures = self.bulk_update(bookmarks, sorted(fields))
+            if failures and not fields <= set(bookmarks[0].schedule_fields):
+                self.write_failed_schedules(list(failures))
+            seconds = (time.perf_counter() - start) / len(bookmarks)
+            for bookmark in bookmarks:
+                timings = self._timings.pop(bookmark, None)
+                self._schedules.pop(bookmark, None)
+                if (error := failures.get(bookmark)) is not None:
+                    logger.warning('Error saving bookmark %s: %r', bookmark.pk, error)
+                    with self._lock:
+                        self.failed += 1
+                        self._unreported_failures += 1
+                    if timings is not None:
+                        timings.error = repr(error)
+                else:
+                    bookmark.snapshot_tracked_fields()
+                    self.written += 1
+                    if not fields <= set(bookmark.schedule_fields):
+                        self.updated += 1
+                if timings is not None:
+                    timings.phases['save'] += seconds
+                    metrics.record(bookmark, timings)
+
+    def write_failed_schedules(self, bookmarks: list['ManhwaBookmark']) -> None:
+        "Writes only the next check of bookmarks that failed to be written, it backs off like a failed update."
+        for bookmark in bookmarks:
+            for name, value in self._schedules.get(bookmark, {}).items():
+                setattr(bookmark, name, value)
+            bookmark.schedule_next_check(new_chapter=False)
+        for bookmark, error in self.bulk_update(bookmarks, list(bookmarks[0].schedule_fields)).items():
+            logger.warning('Error scheduling bookmark %s: %r', bookmark.pk, error)
+
+    def bulk_update(self, bookmarks: list['ManhwaBookmark'], fields: list[str]) -> dict['ManhwaBookmark', Exception]:
+        "Writes the bookmarks, one by one if the batch conflicts. Returns the errors of the bookmarks that failed."
+        manager = type(bookmarks[0])._default_manager
+        try:
+            # a savepoint inside a transaction, so the failed update doesn't break it
+            with transaction.atomic(using=manager.db):
+                manager.bulk_update(bookmarks, fields)
+            return {}
+        except IntegrityError as e:
+            if len(bookmarks) == 1:
+                return {bookmarks[0]: e}
+        failures: dict['ManhwaBookmark', Exception] = {}
+        for bookmark in bookmarks:
+            try:
+                with transaction.atomic(using=manager.db):
+                    manager.bulk_update([bookmark], fields)
+            except IntegrityError as e:
+                failures[bookmark] = e
+        return failures
+
+    def update_stats(self, stats: CrawlStats) -> None:
+        "Sets the updated bookmarks of `stats`, the bookmarks that failed to be written move from processed to errors."
+        with self._lock:
+            failed, self._unreported_failures = self._unreported_failures, 0
+        stats.processed -= failed
+        stats.errors += failed
+        stats.updated = self.updated
+
+    def write_full_batches(self) -> None:
+        while batch := self.take_batch():
+            self.write(batch)
+
+    def flush(self) -> None:
+        while batch := self.take_batch(force=True):
+            self.write(batch)
+
+
+def extract_bookmark(bookmark: 'ManhwaBookmark', parse_executor: Executor | None = None,
+        timings: metrics.BookmarkTimings | None = None) -> ExtractorResult:
+    with metrics.collect(timings):
+        return bookmark.get_extractor_instance(parse_executor=parse_executor)()
+
+
+@contextmanager
+def parse_pool(workers: int | None) -> Iterator[ProcessPoolExecutor | None]:
+    "Process pool where the pages are parsed, None when the pages are parsed by the crawler workers."
+    if not workers:
+        yield None
+        return
+    # the pool is started from a crawler thread while other threads run, forking them could deadlock the parsers
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('forkserver')) as executor:
+        yield executor
+
+
+def start_worker_thread(threads: list[int]) -> None:
+    "Initializer of the crawler threads. They use the browser pool, it is released by release_thread_resources."
+    threads.append(threading.get_ident())
+    browser_pool.enable_current_thread()
+
+
+def release_thread_resources(executor: ThreadPoolExecutor, threads: int) -> None:
+    "Releases the resources bound to each of the `threads` worker threads of the executor, like playwright browsers."
+    barrier = threading.Barrier(threads)
+
+    def release() -> None:
+        browser_pool.close_current_thread()
+        # keeps the thread busy until every other thread took one of the tasks
+        barrier.wait(timeout=60)
+
+    wait([executor.submit(release) for _ in range(threads)])
+
+
+@dataclass
+class HostLimits:
+    concurrency: int
+    # bookmark updates started per second, None for no limit
+    rate: float | None = None
+
+
+class HostScheduler:
+    """
+    Politeness scheduler: limits how many bookmarks of the same host are updated at the same time and
+    how often updates on that host are started. Different hosts don't limit each other.
+    """
+    default_limits: HostLimits
+    host_limits: dict[str, HostLimits]
+
+    def __init__(self, concurrency: int | None = None, rate: float | None = None,
+            host_limits: dict[str, HostLimits] | None = None):
+        self.default_limits = HostLimits(
+            concurrency=concurrency or app_settings.HOST_CONCURRENCY,
+            rate=rate if rate is not None else app_settings.HOST_RATE,
+        )
+        self.host_limits = {
+            host: HostLimits(
+                concurrency=limits.get('concurrency', self.default_limits.concurrency),
+                rate=limits.get('rate', self.default_limits.rate),
+            )
+            for host, limits in app_settings.HOST_LIMITS.items()
+        }
+        self.host_limits.update(host_limits or {})
+        self._lock = threading.Lock()
+        self._running: defaultdict[str, int] = defaultdict(int)
+        self._next_start: dict[str, float] = {}
+        self._async_semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def get_limits(self, host: str) -> HostLimits:
+        return self.host_limits.get(host, self.default_limits)
+
+    def try_acquire(self, host: str) -> bool:
+        "Takes a concurrency slot of the host if there is one available."
+        with self._lock:
+            if self._running[host] >= self.get_limits(host).concurrency:
+                return False
+            self._running[host] += 1
+            return True
+
+    def release(self, host: str) -> None:
+        with self._lock:
+            self._running[host] -= 1
+
+    def reserve_start(self, host: str) -> float:
+        "Reserves the next start time allowed by the host rate. Returns the seconds to wait until then."
+        rate = self.get_limits(host).rate
+        if not rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + 1 / rate
+            return start - now
+
+    @asynccontextmanager
+    async def aslot(self, host: str) -> AsyncIterator[None]:
+        semaphore = self._async_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._async_semaphores[host] = asyncio.Semaphore(self.get_limits(host).concurrency)
+        async with semaphore:
+            await asyncio.sleep(self.reserve_start(host))
+            yield
+
+
+class ThreadPoolCrawler:
+    """
+    Updates every bookmark in a worker thread, each one blocking on its own backend I/O.
+
+    Bookmarks are only handed to the pool while their host has a free slot in the scheduler, so the
+    workers keep busy with other hosts instead of waiting on a throttled one. The workers only extract,
+    the results are written from the calling thread.
+
+    The bookmarks are consumed lazily, at most `window` of them are waiting for a slot at any time. With
+    `parse_workers` the threads only fetch, the pages are parsed in a pool of that many processes. The
+    `progress` callback gets the stats while the crawl runs, from the calling thread.
+    """
+    max_workers: int
+    scheduler: HostScheduler
+    batch_size: int | None
+    window: int
+    parse_workers: int | None
+    progress: ProgressCallback | None
+
+    def __init__(self, max_workers: int = 10, scheduler: HostScheduler | None = None, batch_size: int | None = None,
+            window: int | None = None, parse_workers: int | None = None, progress: ProgressCallback | None = None):
+        self.max_workers = max_workers
+        self.scheduler = scheduler or HostScheduler()
+        self.batch_size = batch_size
+        self.window = window or max_workers * 10
+        self.parse_workers = parse_workers
+        self.progress = progress
+
+    def _extract_bookmark(self, bookmark: 'ManhwaBookmark', host: str, parse_executor: Executor | None,
+            timings: metrics.BookmarkTimings) -> ExtractorResult:
+        try:
+            time.sleep(self.scheduler.reserve_start(host))
+            return extract_bookmark(bookmark, parse_executor, timings)
+        finally:
+            self.scheduler.release(host)
+
+    def crawl(self, bookmarks: Iterable['ManhwaBookmark'], total: int | None = None) -> CrawlStats:
+        "`total` is the number of bookmarks, when `bookmarks` is an iterator that can't tell it."
+        bookmarks = iter(bookmarks)
+        pending: defaultdict[str, deque['ManhwaBookmark']] = defaultdict(deque)
+        pending_count = 0
+        exhausted = False
+        stats = CrawlStats(total=total or 0)
+        writer = BulkWriter(self.batch_size)
+        reporter = ProgressReporter(self.progress)
+        threads: list[int] = []
+        start = time.perf_counter()
+        with parse_pool(self.parse_workers) as parse_executor, \
+                ThreadPoolExecutor(self.max_workers, initializer=start_worker_thread, initargs=(threads,)) as executor:
+            futures: dict[Future[ExtractorResult], tuple['ManhwaBookmark', metrics.BookmarkTimings]] = {}
+            # the browsers of the worker threads are closed even when the crawl fails
+            try:
+                while True:
+                    while not exhausted and pending_count < self.window:
+                        bookmark = next(bookmarks, None)
+                        if bookmark is None:
+                            exhausted = True
+                            break
+                        pending[bookmark.get_host()].append(bookmark)
+                        pending_count += 1
+                        if total is None:
+                            stats.total += 1
+                    if not pending and not futures:
+                        break
+                    for host, queue in list(pending.items()):
+                        while queue and len(futures) < self.max_workers and self.scheduler.try_acquire(host):
+                            bookmark = queue.popleft()
+                            pending_count -= 1
+                            timings = metrics.BookmarkTimings(host, bookmark.extractor_type)
+                            future = executor.submit(self._extract_bookmark, bookmark, host, parse_executor, timings)
+                            futures[future] = bookmark, timings
+                        if not queue:
+                            del pending[host]
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        bookmark, timings = futures.pop(future)
+                        try:
+                            writer.add(bookmark, future.result(), timings)
+                            stats.processed += 1
+                        except Exception as e:
+                            stats.errors += 1
+                            logger.warning('Error updating bookmark %s: %r', bookmark.pk, e)
+                            timings.error = repr(e)
+                            metrics.record(bookmark, timings)
+                            writer.add_failed(bookmark)
+                    writer.write_full_batches()
+                    if reporter.due():
+                        writer.update_stats(stats)
+                        stats.elapsed = time.perf_counter() - start
+                        reporter.report(stats)
+            finally:
+                release_thread_resources(executor, len(threads))
+        writer.flush()
+        writer.update_stats(stats)
+        stats.elapsed = time.perf_counter() - start
+        reporter.report(stats)
+        logger.info('%s', stats)
+        return stats
+
+
+class AsyncCrawler:
+    """
+    Updates bookmarks from a single event loop, keeping up to `concurrency` fetches in flight.
+
+    Bookmarks whose extractor type has no async backend are updated in a pool of `thread_workers` threads.
+    The bookmarks are read `chunk_size` at a time, at most `window` of them are waiting or being updated.
+    With `parse_workers` the pages are parsed in a pool of that many processes instead of the event loop.
+    The `progress` callback gets the stats while the crawl runs, it may use the ORM.
+    """
+    concurrency: int
+    thread_workers: int
+    scheduler: HostScheduler
+    batch_size: int | None
+    transport: httpx.AsyncBaseTransport | None
+    chunk_size: int
+    window: int
+    parse_workers: int | None
+    progress: ProgressCallback | None
+
+    def __init__(self, concurrency: int = 100, scheduler: HostScheduler | None = None, batch_size: int | None = None,
+            transport: httpx.AsyncBaseTransport | None = None, thread_workers: int = 10, chunk_size: int = 100,
+            window: int | None = None, parse_workers: int | None = None, progress: ProgressCallback | None = None):
+        self.concurrency = concurrency
+        self.thread_workers = thread_workers
+        self.scheduler = scheduler or HostScheduler()
+        self.batch_size = batch_size
+        self.transport = transport
+        self.chunk_size = chunk_size
+        self.window = window or concurrency * 4
+        self.parse_workers = parse_workers
+        self.progress = progress
+
+    def crawl(self, bookmarks: Iterable['ManhwaBookmark'], total: int | None = None) -> CrawlStats:
+        "`total` is the number of bookmarks, when `bookmarks` is an iterator that can't tell it."
+        # the iterator is started here because the ORM can't be used from the event loop
+        return async_to_sync(self.acrawl)(iter(bookmarks), total)
+
+    async def _extract_bookmark(self, bookmark: 'ManhwaBookmark', client: httpx.AsyncClient,
+            executor: ThreadPoolExecutor, parse_executor: Executor | None,
+            timings: metrics.BookmarkTimings) -> ExtractorResult:
+        extractor = bookmark.get_async_extractor_instance(client, parse_executor)
+        if extractor is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, extract_bookmark, bookmark, parse_executor, timings)
+        with metrics.collect(timings):
+            return await extractor()
+
+    async def acrawl(self, bookmarks: Iterator['ManhwaBookmark'], total: int | None = None) -> CrawlStats:
+        stats = CrawlStats(total=total or 0)
+        read_chunk = sync_to_async(lambda: list(islice(bookmarks, self.chunk_size)))
+        window = asyncio.Semaphore(self.window)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        writer = BulkWriter(self.batch_size)
+        reporter = ProgressReporter(self.progress)
+
+        async def worker(bookmark: 'ManhwaBookmark') -> None:
+            try:
+                host = bookmark.get_host()
+                timings = metrics.BookmarkTimings(host, bookmark.extractor_type)
+                # the host slot is taken first so a throttled host doesn't hold the global slots
+                async with self.scheduler.aslot(host), semaphore:
+                    try:
+                        result = await self._extract_bookmark(bookmark, client, executor, parse_executor, timings)
+                        writer.add(bookmark, result, timings)
+                        stats.processed += 1
+                    except Exception as e:
+                        stats.errors += 1
+                        logger.warning('Error updating bookmark %s: %r', bookmark.pk, e)
+                        timings.error = repr(e)
+                        # the signal receivers may use the ORM
+                        await sync_to_async(metrics.record)(bookmark, timings)
+                        writer.add_failed(bookmark)
+                # the batch is taken before writing so other workers keep adding to the next one
+                if batch := writer.take_batch():
+                    await sync_to_async(writer.write)(batch)
+                if reporter.due():
+                    writer.update_stats(stats)
+                    stats.elapsed = time.perf_counter() - start
+                    await sync_to_async(reporter.report)(stats)
+            finally:
+                window.release()
+
+        async def crawl_all() -> None:
+            tasks: set[asyncio.Task] = set()
+            while chunk := await read_chunk():
+                if total is None:
+                    stats.total += len(chunk)
+                for bookmark in chunk:
+                    await window.acquire()
+                    task = asyncio.create_task(worker(bookmark))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+
+        threads: list[int] = []
+        start = time.perf_counter()
+        with parse_pool(self.parse_workers) as parse_executor, ThreadPoolExecutor(
+                self.thread_workers, initializer=start_worker_thread, initargs=(threads,)) as executor:
+            try:
+                async with httpx.AsyncClient(limits=limits, transport=self.transport) as client:
+                    await crawl_all()
+            finally:
+                await asyncio.to_thread(release_thread_resources, executor, len(threads))
+        await sync_to_async(writer.flush)()
+        writer.update_stats(stats)
+        stats.elapsed = time.perf_counter() - start
+        await sync_to_async(reporter.report)(stats)
+        logger.info('%s', stats)
+        return stats
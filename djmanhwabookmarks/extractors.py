@@ -1,20 +1,41 @@
-from typing import cast, Protocol, Iterator
+from typing import Protocol, Iterator, AsyncIterator, Mapping, Sequence, Collection, Callable
+import asyncio
+import copy
+import hashlib
 import time
 import re
 from urllib.parse import urljoin
 from dataclasses import dataclass
+from concurrent.futures import Executor
 from lxml import etree, html
-from contextlib import contextmanager
-from playwright.sync_api import Page, sync_playwright, Locator
+from cssselect import SelectorError
+from contextlib import contextmanager, asynccontextmanager
+from playwright.sync_api import Page, Route, sync_playwright, Locator, TimeoutError as PlaywrightTimeoutError
 
 import bs4
 import mechanicalsoup
 import soupsieve
 import requests
+import httpx
 
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
+from . import metrics
+from .archives import ResponseArchive, ArchivedResponse, archive_mode
+from .caches import ResponseCache, compile_css, compile_regex, compile_xpath, normalize_url
+from .sessions import SessionPool
+from .browsers import BrowserPool, readiness_stats, resource_blocking_stats
+
+
+@dataclass
+class PageValidators:
+    "Cache validators of a fetched page. `modified` is False when the page didn't change since the last fetch."
+    etag: str = ''
+    last_modified: str = ''
+    content_hash: str = ''
+    modified: bool = True
+
 
 @dataclass
 class ExtractorParams:
@@ -28,6 +49,13 @@ class ExtractorParams:
     title_selector: str
     description_selector: str
 
+    # validators of the last fetch, used to skip pages that didn't change
+    url: str | None = None
+    chapter_page_validators: PageValidators | None = None
+    main_page_validators: PageValidators | None = None
+    # when False the series page is only fetched if its url is not `url`
+    refresh_main_page: bool = True
+
 
 @dataclass
 class ExtractorResult:
@@ -37,13 +65,44 @@ class ExtractorResult:
     chapter_number: float | None = None
     next_chapter_url: str | None = None
 
+    # when a page is not modified the fields extracted from it must be ignored
+    chapter_page_modified: bool = True
+    main_page_modified: bool = True
+    chapter_page_validators: PageValidators | None = None
+    main_page_validators: PageValidators | None = None
+
+
+def get_conditional_headers(validators: PageValidators | None) -> dict[str, str]:
+    headers = {}
+    if validators is not None:
+        if validators.etag:
+            headers['If-None-Match'] = validators.etag
+        if validators.last_modified:
+            headers['If-Modified-Since'] = validators.last_modified
+    return headers
+
+
+def get_page_validators(status_code: int, headers: Mapping[str, str], content: bytes,
+        previous: PageValidators | None) -> PageValidators:
+    "Returns the validators of a response to a request sent with the conditional headers of `previous`."
+    if status_code == 304 and previous is not None:
+        return PageValidators(previous.etag, previous.last_modified, previous.content_hash, modified=False)
+    content_hash = hashlib.sha256(content).hexdigest()
+    return PageValidators(
+        etag=headers.get('ETag', ''),
+        last_modified=headers.get('Last-Modified', ''),
+        content_hash=content_hash,
+        modified=previous is None or previous.content_hash != content_hash,
+    )
+
 
 class ExtractorBackend(Protocol):
     @staticmethod
     def validate_selector_syntax(value: str):
         ...
 
-    def open(self, url: str) -> None:
+    def open(self, url: str, validators: PageValidators | None = None,
+            wait_selectors: Sequence[str] = ()) -> PageValidators:
         ...
 
     def get_text_content(self, selector: str) -> str | None:
@@ -52,11 +111,38 @@ class ExtractorBackend(Protocol):
     def get_attribute(self, selector: str, attribute: str, required_tag: str | None = None) -> str | None:
         ...
 
+    def get_many(self, selectors: Sequence[str]) -> Mapping[str, object | None]:
+        ...
+
     @contextmanager
     def context(self) -> Iterator['ExtractorBackend']:
         ...
 
 
+class AsyncExtractorBackend(Protocol):
+    @staticmethod
+    def validate_selector_syntax(value: str):
+        ...
+
+    async def open(self, url: str, validators: PageValidators | None = None,
+            wait_selectors: Sequence[str] = ()) -> PageValidators:
+        ...
+
+    def get_text_content(self, selector: str) -> str | None:
+        ...
+
+    def get_attribute(self, selector: str, attribute: str, required_tag: str | None = None) -> str | None:
+        ...
+
+    def get_many(self, selectors: Sequence[str]) -> Mapping[str, object | None]:
+        ...
+
+    @asynccontextmanager
+    async def context(self) -> AsyncIterator['AsyncExtractorBackend']:
+        ...
+        yield self
+
+
 class Extractor(Protocol):
     def __init__(self, backend: ExtractorBackend, params: ExtractorParams):
         ...
@@ -84,25 +170,114 @@ class Extractor(Protocol):
 #             raise ValidationError(_("Invalid regular expression syntax."))
 
 
-class MechanicalSoupExtractorBackend:
-    browser: mechanicalsoup.StatefulBrowser
-    page: bs4.BeautifulSoup | None
+class RequestsFetchMixin:
+    """
+    Fetches pages with a session borrowed from `session_pool`, or the backend own session when there is no pool.
+    With a `response_cache` the pages already downloaded during the current crawl are taken from it.
+    """
+    session_pool: SessionPool | None
+    response_cache: ResponseCache | None
+    # normalized url and validators of the loaded page
+    loaded: tuple[str, PageValidators] | None = None
+
+    def get_own_session(self) -> requests.Session:
+        raise NotImplementedError
+
+    @contextmanager
+    def _session(self, url: str) -> Iterator[requests.Session]:
+        if self.session_pool is None:
+            yield self.get_own_session()
+            return
+        with self.session_pool.session(url) as session:
+            yield session
+
+    def fetch(self, url: str, validators: PageValidators | None = None) -> tuple[requests.Response, PageValidators]:
+        response = self.response_cache.get(url) if self.response_cache is not None else None
+        cached = response is not None
+        if response is None:
+            writer = archive_mode.writer
+            # while recording the pages are downloaded in full, a 304 would leave them out of the archive
+            headers = get_conditional_headers(validators) if writer is None else {}
+            with metrics.phase('download'), self._session(url) as session:
+                response = session.get(url, headers=headers)
+            if writer is not None:
+                writer.add(url, response.status_code, response.headers, response.content)
+            if self.response_cache is not None:
+                self.response_cache.put(url, response)
+        if timings := metrics.current_timings():
+            timings.add_page(len(response.content), cached)
+        page_validators = get_page_validators(response.status_code, response.headers, response.content, validators)
+        return response, page_validators
+
+    def reopen(self, url: str, validators: PageValidators | None) -> PageValidators | None:
+        "When `url` is the loaded page returns its validators, the page isn't fetched nor parsed again."
+        if self.loaded is None or self.loaded[0] != normalize_url(url):
+            return None
+        loaded = self.loaded[1]
+        return PageValidators(loaded.etag, loaded.last_modified, loaded.content_hash,
+            modified=validators is None or validators.content_hash != loaded.content_hash)
+
+    def set_loaded(self, url: str, validators: PageValidators) -> None:
+        self.loaded = (normalize_url(url), validators)
 
-    def __init__(self):
-        self.browser = mechanicalsoup.StatefulBrowser()
-        self.page = None
 
-    def open(self, url: str) -> None:
-        self.browser.open(url)
-        self.page = cast(bs4.BeautifulSoup, self.browser.page)
+class MechanicalSoupExtractorBackend(RequestsFetchMixin):
+    browser: mechanicalsoup.StatefulBrowser | None
+    page: bs4.BeautifulSoup | None
+    # first match of the selectors already queried on the page
+    matches: dict[str, bs4.Tag | None]
+    soup_config = {'features': 'lxml'}
+
+    def __init__(self, session_pool: SessionPool | None = None, response_cache: ResponseCache | None = None):
+        "When a session pool is given pages are fetched with sessions borrowed from it instead of an own browser."
+        self.session_pool = session_pool
+        self.response_cache = response_cache
+        self.browser = None
+        self.page = None
+        self.matches = {}
+
+    def get_own_session(self) -> requests.Session:
+        if self.browser is None:
+            self.browser = mechanicalsoup.StatefulBrowser(soup_config=self.soup_config)
+        return self.browser.session
+
+    def open(self, url: str, validators: PageValidators | None = None,
+            wait_selectors: Sequence[str] = ()) -> PageValidators:
+        "Fetches the page. It is only parsed when it was modified since the fetch that returned `validators`."
+        if (page_validators := self.reopen(url, validators)) is not None:
+            return page_validators
+        response, page_validators = self.fetch(url, validators)
+        if page_validators.modified:
+            # cached responses are shared by threads, the soup is attached to a copy
+            response = copy.copy(response)
+            with metrics.phase('parse'):
+                mechanicalsoup.Browser.add_soup(response, self.soup_config)
+            self.page = response.soup
+            self.matches = {}
+            self.set_loaded(url, page_validators)
+        return page_validators
+
+    def load(self, content: bytes) -> None:
+        "Parses an already downloaded page."
+        with metrics.phase('parse'):
+            self.page = bs4.BeautifulSoup(content, **self.soup_config)
+        self.matches = {}
 
     def _get_selector_tag(self, selector: str | None) -> bs4.Tag | None:
         if not selector or not self.page:
             return None
-        tag = self.page.select_one(selector)
-        if not tag:
-            return None
-        return tag
+        if selector not in self.matches:
+            with metrics.selector(selector):
+                self.matches[selector] = compile_css(selector).select_one(self.page) or None
+        return self.matches[selector]
+
+    def get_many(self, selectors: Sequence[str]) -> dict[str, bs4.Tag | None]:
+        """
+        First match of every selector, the later lookups of the selectors reuse the matches. Each selector is
+        a separate select_one, it stops at the first match and is faster than a single walk with the union of
+        the selectors, which matches every tag of the page against each selector.
+        """
+        return {selector: self._get_selector_tag(selector) for selector in selectors if selector}
 
     def get_text_content(self, selector: str) -> str | None:
         tag = self._get_selector_tag(selector)
@@ -126,7 +301,7 @@ class MechanicalSoupExtractorBackend:
     @staticmethod
     def validate_selector_syntax(value: str):
         try:
-            soupsieve.compile(value)
+            compile_css(value)
         except soupsieve.util.SelectorSyntaxError:
             raise ValidationError(_("Invalid css selector syntax."))
 
@@ -135,26 +310,148 @@ class MechanicalSoupExtractorBackend:
         yield self
 
 
-class PlayWrightExtractorBackend:
-    page: Page | None
+class AsyncSoupExtractorBackend(MechanicalSoupExtractorBackend):
+    "Fetches pages with a shared httpx.AsyncClient and queries them with BeautifulSoup."
+    client: httpx.AsyncClient | None
 
-    def __init__(self):
+    def __init__(self, client: httpx.AsyncClient | None = None, response_cache: ResponseCache | None = None):
+        self.client = client
+        self.response_cache = response_cache
         self.page = None
+        self.matches = {}
+
+    async def fetch(self, url: str,  # type: ignore[override]
+            validators: PageValidators | None = None) -> tuple[httpx.Response | None, PageValidators]:
+        if self.client is None:
+            return None, PageValidators()
+        response = self.response_cache.get(url) if self.response_cache is not None else None
+        cached = response is not None
+        timings = metrics.current_timings()
+        if response is None:
+            writer = archive_mode.writer
+            headers = get_conditional_headers(validators) if writer is None else {}
+            trace = metrics.ConnectTrace(timings) if timings is not None else None
+            start = time.perf_counter()
+            response = await self.client.get(url, headers=headers, follow_redirects=True,
+                extensions={'trace': trace} if trace is not None else None)
+            if trace is not None:
+                timings.phases['download'] += time.perf_counter() - start - trace.seconds
+            if writer is not None:
+                writer.add(url, response.status_code, response.headers, response.content)
+            if self.response_cache is not None:
+                self.response_cache.put(url, response)
+        if timings is not None:
+            timings.add_page(len(response.content), cached)
+        page_validators = get_page_validators(response.status_code, response.headers, response.content, validators)
+        return response, page_validators
+
+    async def open(self, url: str, validators: PageValidators | None = None,  # type: ignore[override]
+            wait_selectors: Sequence[str] = ()) -> PageValidators:
+        if (page_validators := self.reopen(url, validators)) is not None:
+            return page_validators
+        response, page_validators = await self.fetch(url, validators)
+        if response is not None and page_validators.modified:
+            self.load(response.content)
+            self.set_loaded(url, page_validators)
+        return page_validators
+
+    @asynccontextmanager
+    async def context(self) -> AsyncIterator['AsyncExtractorBackend']:  # type: ignore[override]
+        if self.client is not None:
+            yield self
+            return
+        async with httpx.AsyncClient() as client:
+            self.client = client
+            try:
+                yield self
+            finally:
+                self.client = None
 
-    def open(self, url: str) -> None:
-        if self.page is None:
-            return None
-        self.page.goto(url)
-        time.sleep(2)
+
+class PlayWrightExtractorBackend:
+    # resources not needed to extract text and links
+    BLOCKED_RESOURCE_TYPES = frozenset({'image', 'media', 'font', 'stylesheet'})
+
+    browser_pool: BrowserPool | None
+    ready_timeout: float
+    blocked_resource_types: Collection[str]
+    page: Page | None
+    # first locator of the selectors already queried on the page
+    matches: dict[str, Locator | None]
+
+    def __init__(self, browser_pool: BrowserPool | None = None, ready_timeout: float = 10,
+            blocked_resource_types: Collection[str] = BLOCKED_RESOURCE_TYPES):
+        "When a browser pool is given the page is opened in the browser of the pool instead of a new one."
+        self.browser_pool = browser_pool
+        self.ready_timeout = ready_timeout
+        self.blocked_resource_types = blocked_resource_types
+        self.page = None
+        self.matches = {}
+
+    def _route_request(self, route: Route) -> None:
+        resource_type = route.request.resource_type
+        if resource_type in self.blocked_resource_types:
+            resource_blocking_stats.record(resource_type)
+            route.abort()
+        else:
+            route.continue_()
+
+    def set_page(self, page: Page) -> None:
+        self.page = page
+        self.matches = {}
+        if self.blocked_resource_types:
+            page.route('**/*', self._route_request)
+
+    def open(self, url: str, validators: PageValidators | None = None,
+            wait_selectors: Sequence[str] = ()) -> PageValidators:
+        "The rendered page is always considered modified."
+        if self.page is not None:
+            with metrics.phase('render'):
+                self.page.goto(url)
+                self.matches = {}
+                self.wait_until_ready(url, wait_selectors)
+            if (writer := archive_mode.writer) is not None:
+                # the rendered page is recorded, it is replayed like a static page
+                writer.add(url, 200, {'Content-Type': 'text/html; charset=utf-8'}, self.page.content().encode())
+        return PageValidators()
+
+    def wait_until_ready(self, url: str, selectors: Sequence[str]) -> None:
+        """
+        Waits up to `ready_timeout` seconds until the first selector is attached to the page. The other
+        selectors may be legitimately missing (there is no next chapter yet), so when some of them isn't
+        attached, or the first one timed out, it waits for the network to be idle instead.
+        """
+        assert self.page is not None
+        start = time.monotonic()
+        selectors = [selector for selector in selectors if selector]
+        timed_out = missing = False
+        if selectors:
+            try:
+                self.page.locator(selectors[0]).first.wait_for(state='attached', timeout=self.ready_timeout * 1000)
+            except PlaywrightTimeoutError:
+                timed_out = True
+            missing = any(self.page.locator(selector).count() == 0 for selector in selectors[1:])
+        if timed_out or missing or not selectors:
+            remaining = max(start + self.ready_timeout - time.monotonic(), 0.5)
+            try:
+                self.page.wait_for_load_state('networkidle', timeout=remaining * 1000)
+            except PlaywrightTimeoutError:
+                ...
+        readiness_stats.record(url, time.monotonic() - start, timed_out)
 
     def _get_selector_tag(self, selector: str | None) -> Locator | None:
         "Returns the first tag from the locator obtained from the selector parameter. If locator is empty returns None."
         if not selector or not self.page:
             return None
-        locator = self.page.locator(selector)
-        if locator.count() == 0:
-            return None
-        return locator.first
+        if selector not in self.matches:
+            with metrics.selector(selector):
+                locator = self.page.locator(selector)
+                self.matches[selector] = locator.first if locator.count() else None
+        return self.matches[selector]
+
+    def get_many(self, selectors: Sequence[str]) -> dict[str, Locator | None]:
+        "Locators of the selectors, each one costs a round trip to the browser so they are kept until the next page."
+        return {selector: self._get_selector_tag(selector) for selector in selectors if selector}
 
     def get_text_content(self, selector: str) -> str | None:
         tag = self._get_selector_tag(selector)
@@ -178,58 +475,140 @@ class PlayWrightExtractorBackend:
 
     @contextmanager
     def context(self) -> Iterator['ExtractorBackend']:
+        if self.browser_pool is not None:
+            with self.browser_pool.page() as page:
+                self.set_page(page)
+                try:
+                    yield self
+                finally:
+                    self.page = None
+            return
         with sync_playwright() as playwright:
             browser = playwright.chromium.launch()
-            self.page = browser.new_page()
+            self.set_page(browser.new_page())
             yield self
 
 
-class LXmlXpathExtractorBackend:
-    page_content: str | None
-    xml: etree._Element | None
-
-    def __init__(self):
-        self.page = None
-
-    def open(self, url: str) -> None:
-        response = requests.get(url)
-        response.raise_for_status()
-        self.page_content = response.text
-        self.xml = html.parse(self.page_content)
-
-    def _get_selector_tag(self, selector: str | None) -> bs4.Tag | None:
-        if not selector or not self.page:
-            return None
-        tag = self.page.select_one(selector)
-        if not tag:
+class LXmlXpathExtractorBackend(RequestsFetchMixin):
+    """
+    Parses pages with lxml and queries them with compiled XPath expressions. Selectors starting with
+    `/`, `./` or `(` are XPath, any other selector is CSS and translated to XPath once.
+    """
+    session: requests.Session | None
+    document: html.HtmlElement | None
+    # first result of the selectors already queried on the document
+    matches: dict[str, html.HtmlElement | str | None]
+
+    def __init__(self, session_pool: SessionPool | None = None, response_cache: ResponseCache | None = None):
+        self.session_pool = session_pool
+        self.response_cache = response_cache
+        self.session = None
+        self.document = None
+        self.matches = {}
+
+    def get_own_session(self) -> requests.Session:
+        if self.session is None:
+            self.session = requests.Session()
+        return self.session
+
+    def open(self, url: str, validators: PageValidators | None = None,
+            wait_selectors: Sequence[str] = ()) -> PageValidators:
+        if (page_validators := self.reopen(url, validators)) is not None:
+            return page_validators
+        response, page_validators = self.fetch(url, validators)
+        if page_validators.modified:
+            self.load(response.content)
+            self.set_loaded(url, page_validators)
+        return page_validators
+
+    def load(self, content: bytes) -> None:
+        "Parses an already downloaded page."
+        with metrics.phase('parse'):
+            self.document = html.document_fromstring(content) if content.strip() else None
+        self.matches = {}
+
+    def _get_selector_result(self, selector: str | None) -> html.HtmlElement | str | None:
+        if not selector or self.document is None:
             return None
-        return tag
+        if selector not in self.matches:
+            with metrics.selector(selector):
+                results = compile_xpath(selector)(self.document)
+            self.matches[selector] = results[0] if isinstance(results, list) and results else None
+        return self.matches[selector]
+
+    def get_many(self, selectors: Sequence[str]) -> dict[str, html.HtmlElement | str | None]:
+        "First result of every selector. Each compiled XPath runs in C, so they are evaluated one by one."
+        return {selector: self._get_selector_result(selector) for selector in selectors if selector}
 
     def get_text_content(self, selector: str) -> str | None:
-        tag = self._get_selector_tag(selector)
-        if tag is None:
+        result = self._get_selector_result(selector)
+        if result is None:
             return None
-        return tag.get_text().strip()
+        if isinstance(result, str):
+            return result.strip()
+        return result.text_content().strip()
 
     def get_attribute(self, selector: str, attribute: str, required_tag: str | None = None) -> str | None:
-        tag = self._get_selector_tag(selector)
-        if tag is None:
+        tag = self._get_selector_result(selector)
+        if tag is None or isinstance(tag, str):
             return None
-        if required_tag and tag.name != required_tag:
-            return None
-        result = tag.get(attribute, None)
-        if result is None:
+        if required_tag and tag.tag != required_tag:
             return None
-        if isinstance(result, str):
-            return result
-        return result[0]
+        return tag.get(attribute)
 
     @staticmethod
     def validate_selector_syntax(value: str):
         try:
-            soupsieve.compile(value)
-        except soupsieve.util.SelectorSyntaxError:
-            raise ValidationError(_("Invalid css selector syntax."))
+            compile_xpath(value)
+        except (etree.XPathSyntaxError, SelectorError):
+            raise ValidationError(_("Invalid selector syntax."))
+
+    @contextmanager
+    def context(self) -> Iterator['ExtractorBackend']:
+        try:
+            yield self
+        finally:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+
+class ArchiveMissError(LookupError):
+    "The page isn't in the replayed archive."
+
+
+class ReplayFetchMixin:
+    """
+    Serves the pages from a recorded archive instead of the network, a replayed sweep extracts the same
+    pages every time and without network. Reading and decompressing a page counts as its download. The
+    validators are ignored, like the recording fetched every page, so every replayed page is parsed.
+    """
+    archive: ResponseArchive
+
+    def fetch(self, url: str, validators: PageValidators | None = None) -> tuple[ArchivedResponse, PageValidators]:
+        with metrics.phase('download'):
+            response = self.archive.get(url)
+        if response is None:
+            raise ArchiveMissError(f'{url} is not in the archive {self.archive.path}.')
+        if timings := metrics.current_timings():
+            timings.add_page(len(response.content))
+        return response, get_page_validators(response.status_code, response.headers, response.content, None)
+
+
+class ReplaySoupExtractorBackend(ReplayFetchMixin, MechanicalSoupExtractorBackend):
+    "Queries the archived pages with BeautifulSoup, like MechanicalSoupExtractorBackend."
+
+    def __init__(self, archive: ResponseArchive):
+        super().__init__()
+        self.archive = archive
+
+
+class ReplayLXmlExtractorBackend(ReplayFetchMixin, LXmlXpathExtractorBackend):
+    "Queries the archived pages with lxml, like LXmlXpathExtractorBackend."
+
+    def __init__(self, archive: ResponseArchive):
+        super().__init__()
+        self.archive = archive
 
 
 class SimpleExtractor:
@@ -243,7 +622,7 @@ class SimpleExtractor:
     @staticmethod
     def validate_regex_syntax(value: str):
         try:
-            re.compile(value)
+            compile_regex(value)
         except re.error:
             raise ValidationError(_("Invalid regular expression syntax."))
 
@@ -299,31 +678,236 @@ class SimpleExtractor:
             ...
         if not self.params.chapter_number_regex:
             return None
-        found = re.findall(self.params.chapter_number_regex, number_str)
+        found = compile_regex(self.params.chapter_number_regex).findall(number_str)
         if not found:
             return None
         return float(found[0])
 
-    def update_chapter(self, result: ExtractorResult) -> None:
-        self.backend.open(self.params.chapter_url)
+    def chapter_page_selectors(self) -> list[str]:
+        "Selectors queried on the chapter page, the backend may wait for them before the page is used."
+        return [self.params.chapter_number_selector, self.params.next_chapter_url_selector, self.params.url_selector]
+
+    def main_page_selectors(self) -> list[str]:
+        return [self.params.title_selector, self.params.description_selector]
+
+    def get_main_page_validators(self, result: ExtractorResult) -> PageValidators | None:
+        # the stored validators only apply if the series url is the same
+        if result.url != self.params.url:
+            return None
+        return self.params.main_page_validators
+
+    def open_chapter_page(self) -> PageValidators:
+        return self.backend.open(self.params.chapter_url, self.params.chapter_page_validators,
+            self.chapter_page_selectors())
+
+    def open_main_page(self, url: str, validators: PageValidators | None) -> PageValidators:
+        return self.backend.open(url, validators, self.main_page_selectors())
+
+    def read_chapter_page(self, result: ExtractorResult) -> None:
+        # the selectors of the page are resolved together, the reads below reuse the matches
+        self.backend.get_many(self.chapter_page_selectors())
         result.chapter_number = self._get_chapter_number()
         result.next_chapter_url = self._get_selector_link(self.params.next_chapter_url_selector)
 
+    def read_main_page(self, result: ExtractorResult) -> None:
+        self.backend.get_many(self.main_page_selectors())
+        result.title = self._get_selector_content(self.params.title_selector) or ''
+        result.description = self._get_selector_content(self.params.description_selector) or ''
+
+    def update_chapter(self, result: ExtractorResult) -> None:
+        validators = self.open_chapter_page()
+        result.chapter_page_validators = validators
+        if not validators.modified:
+            result.chapter_page_modified = result.main_page_modified = False
+            return
+        self.read_chapter_page(result)
+
     def update_bookmark_url(self, result: ExtractorResult) -> None:
         # self.backend.open(self.params.chapter_url)
         result.url = self._get_selector_link(self.params.url_selector)
 
+    def skip_main_page(self, result: ExtractorResult) -> bool:
+        return not self.params.refresh_main_page and result.url == self.params.url
+
+    def prepare_main_page(self, result: ExtractorResult) -> bool:
+        """
+        Whether the series page must be opened. When the chapter page didn't change the series url is the
+        stored one, its page is only opened once it has to be refreshed.
+        """
+        if result.chapter_page_modified:
+            self.update_bookmark_url(result)
+            return True
+        if not self.params.refresh_main_page or not self.params.url:
+            return False
+        result.url = self.params.url
+        result.main_page_modified = True
+        return True
+
     def update_main_page(self, result: ExtractorResult) -> None:
         if result.url is None:
             return
-        self.backend.open(result.url)
-        result.title = self._get_selector_content(self.params.title_selector) or ''
-        result.description = self._get_selector_content(self.params.description_selector) or ''
+        if self.skip_main_page(result):
+            result.main_page_modified = False
+            return
+        validators = self.open_main_page(result.url, self.get_main_page_validators(result))
+        result.main_page_validators = validators
+        if not validators.modified:
+            result.main_page_modified = False
+            return
+        self.read_main_page(result)
 
     def __call__(self) -> ExtractorResult:
         with self.backend.context():
             result = ExtractorResult()
             self.update_chapter(result)
-            self.update_bookmark_url(result)
-            self.update_main_page(result)
+            if self.prepare_main_page(result):
+                self.update_main_page(result)
             return result
+
+
+class AsyncSimpleExtractor(SimpleExtractor):
+    backend: AsyncExtractorBackend  # type: ignore[assignment]
+
+    def __init__(self, backend: AsyncExtractorBackend, params: ExtractorParams):
+        self.params = params
+        self.backend = backend
+
+    async def open_chapter_page(self) -> PageValidators:  # type: ignore[override]
+        return await self.backend.open(self.params.chapter_url, self.params.chapter_page_validators,
+            self.chapter_page_selectors())
+
+    async def open_main_page(self, url: str, validators: PageValidators | None) -> PageValidators:  # type: ignore[override]
+        return await self.backend.open(url, validators, self.main_page_selectors())
+
+    async def update_chapter(self, result: ExtractorResult) -> None:  # type: ignore[override]
+        validators = await self.open_chapter_page()
+        result.chapter_page_validators = validators
+        if not validators.modified:
+            result.chapter_page_modified = result.main_page_modified = False
+            return
+        self.read_chapter_page(result)
+
+    async def update_main_page(self, result: ExtractorResult) -> None:  # type: ignore[override]
+        if result.url is None:
+            return
+        if self.skip_main_page(result):
+            result.main_page_modified = False
+            return
+        validators = await self.open_main_page(result.url, self.get_main_page_validators(result))
+        result.main_page_validators = validators
+        if not validators.modified:
+            result.main_page_modified = False
+            return
+        self.read_main_page(result)
+
+    async def __call__(self) -> ExtractorResult:  # type: ignore[override]
+        async with self.backend.context():
+            result = ExtractorResult()
+            await self.update_chapter(result)
+            if self.prepare_main_page(result):
+                await self.update_main_page(result)
+            return result
+
+
+ParserBackend = MechanicalSoupExtractorBackend | LXmlXpathExtractorBackend
+
+
+def parse_chapter_page(backend_class: type[ParserBackend], params: ExtractorParams, content: bytes) -> ExtractorResult:
+    "Reads the values of a downloaded chapter page. Runs in the worker processes of the process pool extractors."
+    backend = backend_class()
+    backend.load(content)
+    extractor = SimpleExtractor(backend, params)
+    result = ExtractorResult()
+    extractor.read_chapter_page(result)
+    extractor.update_bookmark_url(result)
+    return result
+
+
+def parse_main_page(backend_class: type[ParserBackend], params: ExtractorParams, content: bytes) -> ExtractorResult:
+    "Reads the values of a downloaded series page. Runs in the worker processes of the process pool extractors."
+    backend = backend_class()
+    backend.load(content)
+    result = ExtractorResult()
+    SimpleExtractor(backend, params).read_main_page(result)
+    return result
+
+
+class ParsedPagesMixin:
+    "Copies the values parsed out of the process by `parse_chapter_page` and `parse_main_page` to the result."
+    parsed: ExtractorResult
+
+    def read_chapter_page(self, result: ExtractorResult) -> None:
+        result.chapter_number = self.parsed.chapter_number
+        result.next_chapter_url = self.parsed.next_chapter_url
+
+    def update_bookmark_url(self, result: ExtractorResult) -> None:
+        # the url was read together with the chapter page
+        result.url = self.parsed.url
+
+    def read_main_page(self, result: ExtractorResult) -> None:
+        result.title = self.parsed.title
+        result.description = self.parsed.description
+
+
+class ProcessPoolExtractor(ParsedPagesMixin, SimpleExtractor):
+    """
+    Fetches the pages in the calling thread and parses them in a worker process of `executor`, so parsing
+    doesn't hold the GIL of the crawler threads. Only the page content and the params are sent to the
+    worker, it sends back an ExtractorResult.
+    """
+    backend: ParserBackend
+    executor: Executor
+
+    def __init__(self, backend: ParserBackend, params: ExtractorParams, executor: Executor):
+        super().__init__(backend, params)
+        self.executor = executor
+        self.parsed = ExtractorResult()
+
+    def get_parser_class(self) -> type[ParserBackend]:
+        "Backend built by the worker. Subclasses that only change how pages are fetched, like replays, parse the same way."
+        if isinstance(self.backend, LXmlXpathExtractorBackend):
+            return LXmlXpathExtractorBackend
+        return MechanicalSoupExtractorBackend
+
+    def open_page(self, url: str, validators: PageValidators | None,
+            parse: Callable[..., ExtractorResult]) -> PageValidators:
+        response, page_validators = self.backend.fetch(url, validators)
+        if page_validators.modified:
+            # the parse time includes sending the page to the worker, selectors aren't timed one by one
+            with metrics.phase('parse'):
+                self.parsed = self.executor.submit(
+                    parse, self.get_parser_class(), self.params, response.content).result()
+        return page_validators
+
+    def open_chapter_page(self) -> PageValidators:
+        return self.open_page(self.params.chapter_url, self.params.chapter_page_validators, parse_chapter_page)
+
+    def open_main_page(self, url: str, validators: PageValidators | None) -> PageValidators:
+        return self.open_page(url, validators, parse_main_page)
+
+
+class AsyncProcessPoolExtractor(ParsedPagesMixin, AsyncSimpleExtractor):
+    "Fetches the pages from the event loop and parses them in a worker process of `executor`."
+    backend: AsyncSoupExtractorBackend  # type: ignore[assignment]
+    executor: Executor
+
+    def __init__(self, backend: AsyncSoupExtractorBackend, params: ExtractorParams, executor: Executor):
+        super().__init__(backend, params)
+        self.executor = executor
+        self.parsed = ExtractorResult()
+
+    async def open_page(self, url: str, validators: PageValidators | None,
+            parse: Callable[..., ExtractorResult]) -> PageValidators:
+        response, page_validators = await self.backend.fetch(url, validators)
+        if response is not None and page_validators.modified:
+            # the worker gets the sync backend, it parses pages the same way
+            with metrics.phase('parse'):
+                self.parsed = await asyncio.wrap_future(
+                    self.executor.submit(parse, MechanicalSoupExtractorBackend, self.params, response.content))
+        return page_validators
+
+    async def open_chapter_page(self) -> PageValidators:  # type: ignore[override]
+        return await self.open_page(self.params.chapter_url, self.params.chapter_page_validators, parse_chapter_page)
+
+    async def open_main_page(self, url: str, validators: PageValidators | None) -> PageValidators:  # type: ignore[override]
+        return await self.open_page(url, validators, parse_main_page)
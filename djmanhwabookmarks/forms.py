@@ -15,5 +15,5 @@ class BookmarkForm(forms.ModelForm):
     def save(self, commit=True) -> models.ManhwaBookmark:
         bookmark = super().save(commit=commit)
         bookmark.copy_template_fields_if_empty()
-        bookmark.update_bookmark(save=commit)
+        bookmark.update_bookmark(save=commit, conditional=False)
         return bookmark
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Iterable, Mapping
+
+from django.core.management.base import BaseCommand, CommandError
+
+from djmanhwabookmarks import models
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports bookmarks from a CSV file with a header row, or a JSON list of objects, with the name and '
+        'chapter_url of each bookmark and optionally its extractor_type. The first update of the new bookmarks '
+        'is queued for the process_update_jobs command.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, - for the standard input.')
+        parser.add_argument('--format', choices=('csv', 'json'), help='Format of the file, by default its extension.')
+        parser.add_argument('--no-scrape', action='store_false', dest='scrape',
+            help="Don't queue the first update of the new bookmarks.")
+
+    def read_entries(self, path: str, format: str | None) -> Iterable[Mapping[str, str]]:
+        if format is None:
+            format = Path(path).suffix.lstrip('.').lower()
+            if format not in ('csv', 'json'):
+                raise CommandError('Unknown file format, use --format.')
+        try:
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f'Could not open {path}: {e}')
+        with stream:
+            if format == 'csv':
+                return list(csv.DictReader(stream))
+            try:
+                entries = json.load(stream)
+            except json.JSONDecodeError as e:
+                raise CommandError(f'Invalid JSON: {e}')
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            raise CommandError('The JSON file must contain a list of objects.')
+        return entries
+
+    def handle(self, *args, **options):
+        entries = self.read_entries(options['path'], options['format'])
+        result = models.ManhwaBookmark.objects.import_bookmarks(entries, scrape=options['scrape'])
+        for name, chapter_url, reason in result.skipped:
+            self.stderr.write(f'Skipped {name!r} {chapter_url!r}: {reason}')
+        self.stdout.write(f'{len(result.created)} bookmarks imported, {len(result.skipped)} skipped')
+        if result.job is not None:
+            self.stdout.write(f'First update queued as {result.job}')
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.core.management.base import BaseCommand
+
+from djmanhwabookmarks import models
+
+
+class Command(BaseCommand):
+    help = 'Runs the bookmark update jobs queued from the admin, waiting for new jobs unless --once is given.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when there are no pending jobs.')
+        parser.add_argument('--poll-interval', type=float, default=5,
+            help='Seconds between checks for new jobs.')
+
+    def handle(self, *args, **options):
+        while True:
+            job = models.UpdateJob.objects.claim_next()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+            self.stdout.write(f'Running {job}')
+            stats = job.run()
+            if stats is not None:
+                for line in stats.report:
+                    self.stdout.write(line)
+            self.stdout.write(
+                f'{job}: {job.get_status_display()}, {job.processed}/{job.total} processed, '
+                f'{job.updated} updated, {job.errors} errors {job.error}'.rstrip())
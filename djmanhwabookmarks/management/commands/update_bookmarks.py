@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from djmanhwabookmarks import archives, crawler, metrics, models
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise CommandError(f'Invalid shard {value!r}, expected i/n.')
+    if count < 1 or not 0 <= index < count:
+        raise CommandError(f'Invalid shard {value!r}, i must be between 0 and n - 1.')
+    return index, count
+
+
+class Command(BaseCommand):
+    help = (
+        'Updates the bookmarks with no next chapter that are due for a check, or all of them with --all. The '
+        'library can be split between several hosts with --shard. A JSON summary of the sweep is written as the '
+        'last line of the output, the command fails when some bookmark failed to update.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', dest='check_all',
+            help='Check every bookmark with no next chapter, not only the ones due for a check.')
+        parser.add_argument('--concurrency', type=int, help='Worker threads, or concurrent fetches with --async.')
+        parser.add_argument('--async', action='store_true', dest='use_async', help='Fetch pages from an event loop.')
+        parser.add_argument('--shard', help='Only update the shard i of n, e.g. 0/4. Bookmarks are split by pk.')
+        parser.add_argument('--extractor-type', action='append', dest='extractor_types',
+            choices=models.ExtractorType.values, help='Only update bookmarks of this extractor type. Repeatable.')
+        parser.add_argument('--batch-size', type=int, help='Bookmarks written per query.')
+        parser.add_argument('--parse-workers', type=int, help='Parse the pages in this many processes.')
+        parser.add_argument('--metrics-file',
+            help='Write the timings of the sweep to this file in the Prometheus text format.')
+        archive = parser.add_mutually_exclusive_group()
+        archive.add_argument('--record', metavar='ARCHIVE', help='Record the downloaded pages to this archive.')
+        archive.add_argument('--replay', metavar='ARCHIVE',
+            help='Read the pages from an archive written with --record instead of the network.')
+
+    def handle(self, *args, **options):
+        manager = models.ManhwaBookmark.objects
+        queryset = manager.all() if options['check_all'] else manager.due_for_check()
+        shard = None
+        if options['shard']:
+            shard = parse_shard(options['shard'])
+            queryset = queryset.shard(*shard)
+        if options['extractor_types']:
+            queryset = queryset.filter(extractor_type__in=options['extractor_types'])
+        archive_context: contextlib.AbstractContextManager = contextlib.nullcontext()
+        scheduler = None
+        if options['record']:
+            archive_context = archives.archive_mode.record(options['record'])
+        elif options['replay']:
+            try:
+                archive = archives.ResponseArchive(options['replay'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot replay {options["replay"]}: {e}')
+            archive_context = archives.archive_mode.replay(archive)
+            # the pages are read from the archive, the hosts don't need the politeness rate
+            scheduler = crawler.HostScheduler(concurrency=options['concurrency'], rate=0)
+        started_at = timezone.now()
+        with archive_context as opened_archive:
+            stats = queryset.update_bookmarks(use_async=options['use_async'], concurrency=options['concurrency'],
+                scheduler=scheduler, batch_size=options['batch_size'], parse_workers=options['parse_workers'])
+            if options['record']:
+                self.stdout.write(f'{len(opened_archive)} pages recorded to {options["record"]}')
+        for line in stats.report:
+            self.stdout.write(line)
+        summary = {
+            'shard': f'{shard[0]}/{shard[1]}' if shard else None,
+            'extractor_types': options['extractor_types'] or [],
+            'started_at': started_at.isoformat(),
+            'finished_at': timezone.now().isoformat(),
+            **stats.as_dict(),
+        }
+        if options['metrics_file']:
+            with open(options['metrics_file'], 'w') as metrics_file:
+                metrics_file.write(metrics.registry.to_prometheus())
+        self.stdout.write(json.dumps(summary))
+        if stats.errors:
+            # a non zero exit status, for cron and CI
+            raise CommandError(f'{stats.errors} of {stats.total} bookmarks failed to update.')
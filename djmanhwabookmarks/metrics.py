@@ -0,0 +1,236 @@
+from typing import TYPE_CHECKING, Any, Iterator, Mapping
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from . import signals
+
+if TYPE_CHECKING:
+    from .models import ManhwaBookmark
+
+
+@dataclass
+class BookmarkTimings:
+    """
+    Seconds spent by the update of one bookmark in each phase (connect, download, render, parse, select,
+    compare and save), the lookup time of each selector and the pages downloaded. `connect` is only known
+    for the httpx backend, the requests backends count the new connections in `download`. `render` is the
+    time playwright takes to load and settle a page. `save` is the share of the bookmark in the bulk update
+    of its batch.
+    """
+    host: str = ''
+    backend: str = ''
+    phases: defaultdict[str, float] = field(default_factory=lambda: defaultdict(float))
+    selectors: defaultdict[str, float] = field(default_factory=lambda: defaultdict(float))
+    pages: int = 0
+    cached_pages: int = 0
+    bytes_downloaded: int = 0
+    error: str = ''
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.phases.values())
+
+    def add_page(self, size: int, cached: bool = False) -> None:
+        self.pages += 1
+        if cached:
+            self.cached_pages += 1
+        else:
+            self.bytes_downloaded += size
+
+
+_current_timings: ContextVar[BookmarkTimings | None] = ContextVar('current_timings', default=None)
+
+
+def current_timings() -> BookmarkTimings | None:
+    "Timings of the bookmark updated by the calling thread or task, None outside of `collect`."
+    return _current_timings.get()
+
+
+@contextmanager
+def collect(timings: BookmarkTimings | None) -> Iterator[BookmarkTimings | None]:
+    "The phases measured inside the block, in this thread or task, are added to `timings`."
+    if timings is None:
+        yield None
+        return
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    "Adds the time spent in the block to the phase `name` of the current bookmark, if there is one."
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.phases[name] += time.perf_counter() - start
+
+
+@contextmanager
+def selector(value: str) -> Iterator[None]:
+    "Adds the time spent in the block to the `select` phase and to the selector of the current bookmark."
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        timings.phases['select'] += seconds
+        timings.selectors[value] += seconds
+
+
+class ConnectTrace:
+    "httpx trace extension adding the TCP connect and TLS handshake time of new connections to `timings`."
+
+    def __init__(self, timings: BookmarkTimings):
+        self.timings = timings
+        self.seconds = 0.0
+        self._started: float | None = None
+
+    async def __call__(self, event_name: str, info: Mapping[str, Any]) -> None:
+        if event_name in ('connection.connect_tcp.started', 'connection.start_tls.started'):
+            self._started = time.perf_counter()
+        elif event_name.startswith(('connection.connect_tcp.', 'connection.start_tls.')) and self._started is not None:
+            seconds = time.perf_counter() - self._started
+            self._started = None
+            self.seconds += seconds
+            self.timings.phases['connect'] += seconds
+
+
+@dataclass
+class Summary:
+    count: int = 0
+    total: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+
+    def __sub__(self, other: 'Summary') -> 'Summary':
+        return Summary(self.count - other.count, self.total - other.total)
+
+
+@dataclass
+class Totals:
+    "Copy of the phase and selector totals of the registry, `top` reports what was observed since it was taken."
+    phases: dict[tuple[str, str, str], Summary]
+    selectors: dict[tuple[str, str], Summary]
+
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    return ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values))
+
+
+class MetricsRegistry:
+    """
+    In-process totals of the bookmark timings by host, backend, phase and selector. The totals grow for the
+    life of the process, like Prometheus counters, and are dumped in the Prometheus text format by
+    `to_prometheus`.
+    """
+    prefix = 'djmanhwabookmarks'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases: defaultdict[tuple[str, str, str], Summary] = defaultdict(Summary)
+        self._selectors: defaultdict[tuple[str, str], Summary] = defaultdict(Summary)
+        self._bookmarks: defaultdict[tuple[str, str, str], int] = defaultdict(int)
+        self._pages: defaultdict[tuple[str, str, str], int] = defaultdict(int)
+        self._bytes: defaultdict[tuple[str, str], int] = defaultdict(int)
+
+    def observe(self, timings: BookmarkTimings) -> None:
+        with self._lock:
+            for name, seconds in timings.phases.items():
+                self._phases[timings.host, timings.backend, name].observe(seconds)
+            for value, seconds in timings.selectors.items():
+                self._selectors[timings.host, value].observe(seconds)
+            self._bookmarks[timings.host, timings.backend, 'error' if timings.error else 'ok'] += 1
+            self._pages[timings.host, timings.backend, 'true'] += timings.cached_pages
+            self._pages[timings.host, timings.backend, 'false'] += timings.pages - timings.cached_pages
+            self._bytes[timings.host, timings.backend] += timings.bytes_downloaded
+
+    def phase_seconds(self) -> dict[tuple[str, str, str], Summary]:
+        with self._lock:
+            return {key: Summary(summary.count, summary.total) for key, summary in self._phases.items()}
+
+    def selector_seconds(self) -> dict[tuple[str, str], Summary]:
+        with self._lock:
+            return {key: Summary(summary.count, summary.total) for key, summary in self._selectors.items()}
+
+    def totals(self) -> Totals:
+        return Totals(self.phase_seconds(), self.selector_seconds())
+
+    def clear(self) -> None:
+        with self._lock:
+            for values in (self._phases, self._selectors, self._bookmarks, self._pages, self._bytes):
+                values.clear()
+
+    def to_prometheus(self) -> str:
+        lines: list[str] = []
+
+        def summary(name: str, help: str, labels: tuple[str, ...], values: Mapping[tuple[str, ...], Summary]) -> None:
+            lines.extend((f'# HELP {self.prefix}_{name} {help}', f'# TYPE {self.prefix}_{name} summary'))
+            for key, value in sorted(values.items()):
+                lines.append(f'{self.prefix}_{name}_sum{{{format_labels(labels, key)}}} {value.total!r}')
+                lines.append(f'{self.prefix}_{name}_count{{{format_labels(labels, key)}}} {value.count}')
+
+        def counter(name: str, help: str, labels: tuple[str, ...], values: Mapping[tuple[str, ...], int]) -> None:
+            lines.extend((f'# HELP {self.prefix}_{name} {help}', f'# TYPE {self.prefix}_{name} counter'))
+            for key, value in sorted(values.items()):
+                lines.append(f'{self.prefix}_{name}{{{format_labels(labels, key)}}} {value}')
+
+        with self._lock:
+            summary('phase_seconds', 'Time spent updating bookmarks, by phase.',
+                ('host', 'backend', 'phase'), self._phases)
+            summary('selector_seconds', 'Time spent looking up the bookmark selectors.',
+                ('host', 'selector'), self._selectors)
+            counter('bookmarks_total', 'Bookmarks updated.', ('host', 'backend', 'outcome'), self._bookmarks)
+            counter('pages_total', 'Pages opened, cached when taken from the response cache.',
+                ('host', 'backend', 'cached'), self._pages)
+            counter('downloaded_bytes_total', 'Bytes of the pages downloaded.', ('host', 'backend'), self._bytes)
+        return '\n'.join(lines) + '\n'
+
+    def top(self, count: int = 5, since: Totals | None = None) -> str:
+        "The hosts and selectors where most of the time went, since the `since` totals were taken if given."
+        phases, selectors = self.phase_seconds(), self.selector_seconds()
+        if since is not None:
+            phases = {key: value - since.phases.get(key, Summary()) for key, value in phases.items()}
+            selectors = {key: value - since.selectors.get(key, Summary()) for key, value in selectors.items()}
+            selectors = {key: value for key, value in selectors.items() if value.count}
+        hosts: defaultdict[str, float] = defaultdict(float)
+        for (host, _, _), value in phases.items():
+            if value.count:
+                hosts[host] += value.total
+        slowest_hosts = sorted(hosts.items(), key=lambda item: item[1], reverse=True)[:count]
+        slowest_selectors = sorted(selectors.items(), key=lambda item: item[1].total, reverse=True)[:count]
+        return '\n'.join([
+            'Slowest hosts: ' + (', '.join(f'{host} {seconds:.2f}s' for host, seconds in slowest_hosts) or 'none'),
+            'Slowest selectors: ' + (', '.join(
+                f'{host} {value!r} {summary.total:.3f}s' for (host, value), summary in slowest_selectors) or 'none'),
+        ])
+
+
+registry = MetricsRegistry()
+
+
+def record(bookmark: 'ManhwaBookmark', timings: BookmarkTimings) -> None:
+    "Adds the timings of a finished bookmark update to the registry and sends the `bookmark_timed` signal."
+    registry.observe(timings)
+    signals.bookmark_timed.send(sender=type(bookmark), bookmark=bookmark, timings=timings)
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djmanhwabookmarks', '0009_alter_manhwabookmark_extractor_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='manhwabookmark',
+            name='chapter_page_etag',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='manhwabookmark',
+            name='chapter_page_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='manhwabookmark',
+            name='chapter_page_last_modified',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='manhwabookmark',
+            name='main_page_etag',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='manhwabookmark',
+            name='main_page_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='manhwabookmark',
+            name='main_page_last_modified',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djmanhwabookmarks', '0010_manhwabookmark_chapter_page_etag_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='manhwabookmark',
+            name='page_ready_timeout',
+            field=models.FloatField(default=10, help_text='Seconds to wait for a rendered page to show its selectors.', verbose_name='Page ready timeout'),
+        ),
+    ]
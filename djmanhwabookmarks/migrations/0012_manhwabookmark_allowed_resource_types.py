@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djmanhwabookmarks', '0011_manhwabookmark_page_ready_timeout'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='manhwabookmark',
+            name='allowed_resource_types',
+            field=models.CharField(blank=True, help_text='Comma separated resource types (image, media, font, stylesheet) a rendered page may load.', max_length=255, verbose_name='Allowed resource types'),
+        ),
+    ]
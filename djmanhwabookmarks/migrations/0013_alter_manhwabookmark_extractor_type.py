@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djmanhwabookmarks', '0012_manhwabookmark_allowed_resource_types'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='manhwabookmark',
+            name='extractor_type',
+            field=models.CharField(choices=[('mechanical_soup', 'MechanicalSoup'), ('playwright', 'Playwright'), ('lxml', 'lxml')], default='mechanical_soup', max_length=100, verbose_name='Extractor type'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djmanhwabookmarks', '0013_alter_manhwabookmark_extractor_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='manhwabookmark',
+            name='main_page_checked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djmanhwabookmarks', '0014_manhwabookmark_main_page_checked_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UpdateJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='Status')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Processed')),
+                ('updated', models.PositiveIntegerField(default=0, verbose_name='Updated')),
+                ('errors', models.PositiveIntegerField(default=0, verbose_name='Errors')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Started at')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finished at')),
+                ('bookmarks', models.ManyToManyField(related_name='update_jobs', to='djmanhwabookmarks.manhwabookmark', verbose_name='Bookmarks')),
+            ],
+            options={
+                'verbose_name': 'Update job',
+                'verbose_name_plural': 'Update jobs',
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
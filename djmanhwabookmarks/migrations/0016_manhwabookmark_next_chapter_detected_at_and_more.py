@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djmanhwabookmarks', '0015_updatejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='manhwabookmark',
+            name='next_chapter_detected_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Next chapter detected at'),
+        ),
+        migrations.AddField(
+            model_name='manhwabookmark',
+            name='next_check_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Next check at'),
+        ),
+        migrations.AddField(
+            model_name='manhwabookmark',
+            name='release_interval',
+            field=models.DurationField(blank=True, editable=False, null=True, verbose_name='Release interval'),
+        ),
+        migrations.AddField(
+            model_name='manhwabookmark',
+            name='unchanged_checks',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Unchanged checks'),
+        ),
+    ]
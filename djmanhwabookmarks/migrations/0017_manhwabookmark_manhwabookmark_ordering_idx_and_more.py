@@ -0,0 +1,25 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djmanhwabookmarks', '0016_manhwabookmark_next_chapter_detected_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='manhwabookmark',
+            index=models.Index(fields=['-priority', '-updated_at'], name='manhwabookmark_ordering_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='manhwabookmark',
+            index=models.Index(condition=models.Q(('next_chapter_url__isnull', True)), fields=['next_check_at'], name='manhwabookmark_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='manhwabookmark',
+            index=models.Index(condition=models.Q(('is_template', True)), fields=['chapter_url'], name='manhwabookmark_template_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
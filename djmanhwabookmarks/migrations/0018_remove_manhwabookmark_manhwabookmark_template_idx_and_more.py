@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:47
+
+from typing import cast
+from urllib.parse import urlparse
+from django.db import migrations, models
+
+
+def set_host_field(apps, schema_editor):
+    Model = cast(type[models.Model], apps.get_model('djmanhwabookmarks', 'ManhwaBookmark'))
+    bookmarks = list(Model.objects.only('chapter_url'))
+    for bookmark in bookmarks:
+        bookmark.host = urlparse(bookmark.chapter_url).netloc.lower()  # type: ignore
+    Model.objects.bulk_update(bookmarks, ['host'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djmanhwabookmarks', '0017_manhwabookmark_manhwabookmark_ordering_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='manhwabookmark',
+            name='manhwabookmark_template_idx',
+        ),
+        migrations.AddField(
+            model_name='manhwabookmark',
+            name='host',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Host'),
+        ),
+        migrations.RunPython(set_host_field, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='manhwabookmark',
+            index=models.Index(condition=models.Q(('is_template', True)), fields=['host'], name='manhwabookmark_template_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djmanhwabookmarks', '0018_remove_manhwabookmark_manhwabookmark_template_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='updatejob',
+            name='use_async',
+            field=models.BooleanField(default=False, verbose_name='Use async crawler'),
+        ),
+    ]
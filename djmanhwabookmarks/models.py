@@ -1,45 +1,198 @@
 # -*- coding: utf-8 -*-
-from typing import Optional, Self
+import logging
+from typing import Any, Iterable, Mapping, Optional, Self
+from datetime import datetime, timedelta
 from urllib.parse import urlparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
 
-from django.utils.translation import gettext_lazy as _
+import httpx
+
+from django.utils.translation import gettext_lazy as _, gettext
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.utils import timezone
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Mod
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 
+from . import archives
 from . import extractors
+from . import crawler
+from . import sessions
+from . import browsers
+from . import caches
+from . import metrics
+from .conf import app_settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BookmarkImport:
+    created: list['ManhwaBookmark'] = field(default_factory=list)
+    # (name, chapter url, reason) of the entries that weren't imported
+    skipped: list[tuple[str, str, str]] = field(default_factory=list)
+    job: Optional['UpdateJob'] = None
+
+
+def normalize_host(url: str) -> str:
+    return urlparse(url).netloc.lower()
 
 
 class ManhwaBookmarkQueryset(models.QuerySet['ManhwaBookmark']):
-    def update_bookmarks(self) -> None:
+    def due_for_check(self) -> Self:
+        "Bookmarks with no next chapter whose next check time has passed."
+        return self.filter(next_chapter_url__isnull=True).filter(
+            Q(next_check_at__isnull=True) | Q(next_check_at__lte=timezone.now()))
+
+    def shard(self, index: int, count: int) -> Self:
+        "Bookmarks of the shard `index` out of `count`, split by pk."
+        return self.alias(shard=Mod('pk', count)).filter(shard=index)
+
+    def update_bookmarks(self, use_async: bool = False, concurrency: int | None = None,
+            scheduler: crawler.HostScheduler | None = None, batch_size: int | None = None,
+            chunk_size: int | None = None, parse_workers: int | None = None,
+            progress: crawler.ProgressCallback | None = None) -> crawler.CrawlStats:
+        """
+        With `parse_workers` the pages are fetched by the crawler and parsed in a pool of that many processes.
+        `progress` is called with the stats of the crawl while it runs. The report of the returned stats
+        tells how the connections, the caches and the browsers were used.
+        """
         # process only bookmarks with no next chapter url
         queryset = self.filter(next_chapter_url__isnull=True)
-        processing_pks = set(queryset.values_list('pk', flat=True))
-        count = queryset.count()
-        with ThreadPoolExecutor(10) as executor:
-            futures = (executor.submit(bookmark.update_bookmark) for bookmark in queryset)
-            for pos, future in enumerate(as_completed(futures)):  # noqa: B007
-                print(f'{pos + 1}/{count}')
-                processed_bookmark = future.result()
-                processing_pks.remove(processed_bookmark.pk)
-                print(f'Bookmarks processing: {processing_pks}')
+        total = queryset.count()
+        # rows are streamed in pk order, so the updates written during the sweep don't move them
+        bookmarks = queryset.only(*self.model.crawl_fields).order_by('pk').iterator(
+            chunk_size=chunk_size or app_settings.CRAWL_CHUNK_SIZE)
+        # the readiness and the blocked requests of the rendered pages are reported per sweep
+        browsers.readiness_stats.clear()
+        browsers.resource_blocking_stats.clear()
+        # the timings and the sessions are kept for the life of the process, the report takes their difference
+        metrics_totals = metrics.registry.totals()
+        session_stats = sessions.session_pool.stats()
+        # pages shared by several bookmarks are downloaded once per sweep
+        with caches.response_cache.sweep():
+            if use_async:
+                stats = crawler.AsyncCrawler(concurrency or 100, scheduler, batch_size,
+                    parse_workers=parse_workers, progress=progress).crawl(bookmarks, total)
+            else:
+                stats = crawler.ThreadPoolCrawler(concurrency or 10, scheduler, batch_size,
+                    parse_workers=parse_workers, progress=progress).crawl(bookmarks, total)
+                stats.report.append(str(sessions.session_pool.stats() - session_stats))
+        stats.report += [
+            str(caches.response_cache), caches.format_cache_stats(), metrics.registry.top(since=metrics_totals)]
+        if browsers.readiness_stats.hosts():
+            stats.report += [str(browsers.readiness_stats), str(browsers.resource_blocking_stats)]
+        return stats
 
 
 class ManhwaBookmarkManager(models.Manager):
     def get_queryset(self):
         return ManhwaBookmarkQueryset(self.model, using=self._db)
 
-    def update_bookmarks(self):
-        return self.get_queryset().update_bookmarks()
+    def shard(self, index: int, count: int) -> ManhwaBookmarkQueryset:
+        return self.get_queryset().shard(index, count)
+
+    def due_for_check(self) -> ManhwaBookmarkQueryset:
+        return self.get_queryset().due_for_check()
+
+    def import_bookmarks(self, entries: Iterable[Mapping[str, str]], scrape: bool = True,
+            batch_size: int | None = None) -> 'BookmarkImport':
+        """
+        Creates bookmarks from entries with a `name`, a `chapter_url` and optionally an `extractor_type`.
+        Entries whose name or chapter url already exist or are too long are skipped. The templates of every
+        host are resolved at once and the new bookmarks are created with `bulk_create`, the existing bookmarks
+        are looked up and created by batches of `batch_size`. With `scrape` their first update is queued as an
+        async UpdateJob.
+        """
+        result = BookmarkImport()
+        batch_size = batch_size or app_settings.BULK_UPDATE_BATCH_SIZE
+        bookmarks: list[ManhwaBookmark] = []
+        names: set[str] = set()
+        chapter_urls: set[str] = set()
+        validate_url = URLValidator()
+        max_name_length = self.model._meta.get_field('name').max_length
+        max_chapter_url_length = self.model._meta.get_field('chapter_url').max_length
+        for entry in entries:
+            name, chapter_url = (entry.get('name') or '').strip(), (entry.get('chapter_url') or '').strip()
+            extractor_type = entry.get('extractor_type') or ExtractorType.MECHANICAL_SOUP
+            try:
+                validate_url(chapter_url)
+            except ValidationError:
+                result.skipped.append((name, chapter_url, gettext('Invalid chapter url')))
+                continue
+            if not name or extractor_type not in ExtractorType.values:
+                result.skipped.append((name, chapter_url, gettext('Missing name or invalid extractor type')))
+                continue
+            if len(name) > max_name_length or len(chapter_url) > max_chapter_url_length:
+                result.skipped.append((name, chapter_url, gettext('Name or chapter url too long')))
+                continue
+            if name in names or chapter_url in chapter_urls:
+                result.skipped.append((name, chapter_url, gettext('Duplicated entry')))
+                continue
+            names.add(name)
+            chapter_urls.add(chapter_url)
+            bookmark = self.model(name=name, chapter_url=chapter_url, extractor_type=extractor_type)
+            bookmark.host = bookmark.get_host()
+            bookmarks.append(bookmark)
+        existing_names: set[str] = set()
+        existing_chapter_urls: set[str] = set()
+        # the lookup is split in batches, the databases limit the parameters of a query
+        for start in range(0, len(bookmarks), batch_size):
+            batch = bookmarks[start:start + batch_size]
+            lookup = Q(name__in=[bookmark.name for bookmark in batch])
+            lookup |= Q(chapter_url__in=[bookmark.chapter_url for bookmark in batch])
+            existing = self.filter(lookup).order_by().values_list('name', 'chapter_url')
+            for name, chapter_url in existing:
+                existing_names.add(name)
+                existing_chapter_urls.add(chapter_url)
+        templates = caches.template_cache.get_many(bookmark.host for bookmark in bookmarks)
+        for bookmark in bookmarks:
+            if bookmark.name in existing_names or bookmark.chapter_url in existing_chapter_urls:
+                result.skipped.append((bookmark.name, bookmark.chapter_url, gettext('Already exists')))
+                continue
+            if bookmark.host in templates:
+                bookmark.copy_template_fields_if_empty(templates[bookmark.host])
+            bookmark.update_priority()
+            result.created.append(bookmark)
+        self.bulk_create(result.created, batch_size=batch_size)
+        if scrape and result.created:
+            result.job = UpdateJob.objects.enqueue(result.created, use_async=True)
+        return result
+
+    def update_bookmarks(self, use_async: bool = False, concurrency: int | None = None,
+            scheduler: crawler.HostScheduler | None = None, batch_size: int | None = None,
+            chunk_size: int | None = None, parse_workers: int | None = None,
+            progress: crawler.ProgressCallback | None = None) -> crawler.CrawlStats:
+        return self.get_queryset().update_bookmarks(use_async=use_async, concurrency=concurrency,
+            scheduler=scheduler, batch_size=batch_size, chunk_size=chunk_size, parse_workers=parse_workers,
+            progress=progress)
 
 
 class ExtractorType(models.TextChoices):
     MECHANICAL_SOUP = 'mechanical_soup', _("MechanicalSoup")
     PLAYWRIGHT = 'playwright', _("Playwright")
+    LXML = 'lxml', _("lxml")
 
 
 EXTRACTOR_BACKEND_TYPES = {
     ExtractorType.MECHANICAL_SOUP: extractors.MechanicalSoupExtractorBackend,
     ExtractorType.PLAYWRIGHT: extractors.PlayWrightExtractorBackend,
+    ExtractorType.LXML: extractors.LXmlXpathExtractorBackend,
+}
+
+# used instead of EXTRACTOR_BACKEND_TYPES while an archive is replayed, the playwright pages were recorded rendered
+REPLAY_EXTRACTOR_BACKEND_TYPES = {
+    ExtractorType.MECHANICAL_SOUP: extractors.ReplaySoupExtractorBackend,
+    ExtractorType.PLAYWRIGHT: extractors.ReplaySoupExtractorBackend,
+    ExtractorType.LXML: extractors.ReplayLXmlExtractorBackend,
+}
+
+ASYNC_EXTRACTOR_BACKEND_TYPES = {
+    ExtractorType.MECHANICAL_SOUP: extractors.AsyncSoupExtractorBackend,
 }
 
 
@@ -48,6 +201,10 @@ class ManhwaBookmark(models.Model):
 
     extractor_type = models.CharField(_("Extractor type"), max_length=100, choices=ExtractorType.choices,
         default=ExtractorType.MECHANICAL_SOUP)
+    page_ready_timeout = models.FloatField(_("Page ready timeout"), default=10,
+        help_text=_("Seconds to wait for a rendered page to show its selectors."))
+    allowed_resource_types = models.CharField(_("Allowed resource types"), max_length=255, blank=True,
+        help_text=_("Comma separated resource types (image, media, font, stylesheet) a rendered page may load."))
 
     name = models.CharField(_("Name"), max_length=255, unique=True)
 
@@ -61,6 +218,8 @@ class ManhwaBookmark(models.Model):
     description_selector = models.CharField(max_length=255, blank=True)
 
     chapter_url = models.URLField(_("Chapter url"), max_length=1000, unique=True)
+    # normalized host of the chapter url, set on save
+    host = models.CharField(_("Host"), max_length=255, blank=True, editable=False)
     chapter_number = models.FloatField(_("Chapter number"), blank=True, null=True, editable=False)
     chapter_number_selector = models.CharField(max_length=255, blank=True)
     chapter_number_regex = models.CharField(max_length=255, blank=True)
@@ -80,26 +239,68 @@ class ManhwaBookmark(models.Model):
 
     updated_at = models.DateTimeField(_("Updated at"), auto_now=True)
 
+    # cache validators of the last fetch of the chapter page and the series page
+    chapter_page_etag = models.CharField(max_length=255, blank=True, editable=False)
+    chapter_page_last_modified = models.CharField(max_length=64, blank=True, editable=False)
+    chapter_page_hash = models.CharField(max_length=64, blank=True, editable=False)
+    main_page_etag = models.CharField(max_length=255, blank=True, editable=False)
+    main_page_last_modified = models.CharField(max_length=64, blank=True, editable=False)
+    main_page_hash = models.CharField(max_length=64, blank=True, editable=False)
+    main_page_checked_at = models.DateTimeField(blank=True, null=True, editable=False)
+
+    # release cadence of the series, used to schedule the next check
+    next_chapter_detected_at = models.DateTimeField(_("Next chapter detected at"), blank=True, null=True,
+        editable=False)
+    release_interval = models.DurationField(_("Release interval"), blank=True, null=True, editable=False)
+    unchanged_checks = models.PositiveIntegerField(_("Unchanged checks"), default=0, editable=False)
+    next_check_at = models.DateTimeField(_("Next check at"), blank=True, null=True, editable=False)
+
     class Meta:
         verbose_name = _("Manhwa bookmark")
         verbose_name_plural = _("Manhwa bookmarks")
         ordering = ('-priority', '-updated_at')
+        indexes = [
+            # default ordering of the change list
+            models.Index(fields=['-priority', '-updated_at'], name='manhwabookmark_ordering_idx'),
+            # bookmarks checked by update_bookmarks and due_for_check
+            models.Index(fields=['next_check_at'], condition=Q(next_chapter_url__isnull=True),
+                name='manhwabookmark_pending_idx'),
+            # templates loaded by the template cache
+            models.Index(fields=['host'], condition=Q(is_template=True), name='manhwabookmark_template_idx'),
+        ]
 
     def __str__(self):
         return self.title or self.name
 
-    def clean(self):
-        extractor = self.get_extractor_instance()
-        extractor.validate_params()
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_tracked_fields()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        loaded_values = getattr(self, '_loaded_values', {})
+        self.snapshot_tracked_fields()
+        if fields is not None:
+            # the fields that weren't refreshed keep their previous snapshot
+            self._loaded_values.update(
+                (field, value) for field, value in loaded_values.items() if field not in fields)
 
     def save(self, *args, **kwargs):
+        self.host = self.get_host()
         if self.pk is None and not self.is_template:
             self.copy_template_fields_if_empty()
-        self.priority = 0 if self.next_chapter_url is None else self.priority_multiplier
+        self.update_priority()
         super().save(*args, **kwargs)
+        self.snapshot_tracked_fields()
 
-    def copy_template_fields_if_empty(self):
-        template = self.get_available_template()
+    def update_priority(self) -> None:
+        self.priority = 0 if self.next_chapter_url is None else self.priority_multiplier
+
+    def copy_template_fields_if_empty(self, template: Optional['ManhwaBookmark'] = None):
+        "Copies the selectors of `template`, by default the available template, to the empty selectors."
+        template = template or self.get_available_template()
         if template is not None:
             if not self.url_selector:
                 self.url_selector = template.url_selector
@@ -114,36 +315,105 @@ class ManhwaBookmark(models.Model):
             if not self.next_chapter_url_selector:
                 self.next_chapter_url_selector = template.next_chapter_url_selector
 
+    def get_host(self) -> str:
+        return normalize_host(self.chapter_url)
+
     def get_available_template(self) -> Optional['ManhwaBookmark']:
-        parse_result = urlparse(self.chapter_url)
-        parse_result = parse_result._replace(path='', query='', fragment='', params='')
-        template_url = parse_result.geturl()
-        return ManhwaBookmark.objects.filter(chapter_url__startswith=template_url, is_template=True).first()
+        return caches.template_cache.get(self.get_host())
+
+    # fields changed by update_bookmark
+    update_tracked_fields = (
+        'url', 'title', 'description', 'chapter_url', 'chapter_number', 'next_chapter_url',
+        'chapter_page_etag', 'chapter_page_last_modified', 'chapter_page_hash',
+        'main_page_etag', 'main_page_last_modified', 'main_page_hash', 'main_page_checked_at',
+    )
+    # fields set by schedule_next_check
+    schedule_fields = ('next_chapter_detected_at', 'release_interval', 'unchanged_checks', 'next_check_at')
+    # fields loaded by update_bookmarks. The description is left out, it's only written when the series page changes
+    crawl_fields = (
+        'name', 'extractor_type', 'page_ready_timeout', 'allowed_resource_types', 'priority_multiplier',
+        'url', 'url_selector', 'title', 'title_selector', 'description_selector',
+        'chapter_url', 'chapter_number', 'chapter_number_selector', 'chapter_number_regex',
+        'next_chapter_url', 'next_chapter_url_selector',
+        'chapter_page_etag', 'chapter_page_last_modified', 'chapter_page_hash',
+        'main_page_etag', 'main_page_last_modified', 'main_page_hash', 'main_page_checked_at',
+        'next_chapter_detected_at', 'release_interval', 'unchanged_checks', 'next_check_at',
+    )
+
+    def snapshot_tracked_fields(self) -> None:
+        "Stores the values of the tracked fields as they are in the database. Deferred fields are left out."
+        self._loaded_values = {
+            field: self.__dict__[field] for field in self.update_tracked_fields if field in self.__dict__
+        }
+
+    def get_dirty_fields(self) -> set[str]:
+        "Tracked fields changed since the bookmark was loaded or saved."
+        loaded_values = getattr(self, '_loaded_values', None)
+        if loaded_values is None:
+            return set(self.update_tracked_fields)
+        return {
+            field for field in self.update_tracked_fields
+            if field in self.__dict__ and (field not in loaded_values or self.__dict__[field] != loaded_values[field])
+        }
 
     def is_modified_for_update(self):
         if self.pk is None:
             return True
-        old = ManhwaBookmark.objects.get(pk=self.pk)
-        return (
-            self.url != old.url or  # noqa: W504
-            self.title != old.title or  # noqa: W504
-            self.description != old.description or  # noqa: W504
-            self.chapter_url != old.chapter_url or  # noqa: W504
-            self.chapter_number != old.chapter_number or  # noqa: W504
-            self.next_chapter_url != old.next_chapter_url  # noqa: W504
+        return bool(self.get_dirty_fields())
+
+    def get_page_validators(self, page: str) -> extractors.PageValidators | None:
+        "Returns the stored validators of `page` ('chapter_page' or 'main_page'), None if it was never fetched."
+        content_hash = getattr(self, f'{page}_hash')
+        if not content_hash:
+            return None
+        return extractors.PageValidators(
+            etag=getattr(self, f'{page}_etag'),
+            last_modified=getattr(self, f'{page}_last_modified'),
+            content_hash=content_hash,
         )
 
+    def set_page_validators(self, page: str, validators: extractors.PageValidators | None) -> None:
+        if validators is None:
+            return
+        setattr(self, f'{page}_etag', validators.etag[:255])
+        setattr(self, f'{page}_last_modified', validators.last_modified[:64])
+        setattr(self, f'{page}_hash', validators.content_hash)
+
     def get_extractor_class(self) -> type[extractors.Extractor]:
         return extractors.SimpleExtractor
 
+    def get_extractor_backend_kwargs(self) -> dict[str, Any]:
+        if self.extractor_type in (ExtractorType.MECHANICAL_SOUP, ExtractorType.LXML):
+            return {'session_pool': sessions.session_pool, 'response_cache': caches.response_cache}
+        if self.extractor_type == ExtractorType.PLAYWRIGHT:
+            return {
+                # outside of the crawler threads, like in web requests, each update launches its own browser
+                'browser_pool': browsers.browser_pool if browsers.browser_pool.is_enabled() else None,
+                'ready_timeout': self.page_ready_timeout,
+                'blocked_resource_types': self.get_blocked_resource_types(),
+            }
+        return {}
+
+    def get_blocked_resource_types(self) -> frozenset[str]:
+        allowed = {resource_type.strip() for resource_type in self.allowed_resource_types.split(',')}
+        return extractors.PlayWrightExtractorBackend.BLOCKED_RESOURCE_TYPES - allowed
+
     def get_extractor_backend(self) -> extractors.ExtractorBackend:
         extractor_type = ExtractorType(self.extractor_type)
+        if (archive := archives.archive_mode.archive) is not None:
+            return REPLAY_EXTRACTOR_BACKEND_TYPES[extractor_type](archive)
         backend_class = EXTRACTOR_BACKEND_TYPES[extractor_type]
-        return backend_class()
+        return backend_class(**self.get_extractor_backend_kwargs())
 
-    def get_extractor_instance(self) -> extractors.Extractor:
-        extractor_class = self.get_extractor_class()
-        params = extractors.ExtractorParams(
+    def needs_main_page_refresh(self) -> bool:
+        "The series page is fetched again when the title is unknown or after MANHWABOOKMARKS_MAIN_PAGE_TTL seconds."
+        if not self.title or self.main_page_checked_at is None:
+            return True
+        return timezone.now() - self.main_page_checked_at >= timedelta(seconds=app_settings.MAIN_PAGE_TTL)
+
+    def get_extractor_params(self, conditional: bool = True) -> extractors.ExtractorParams:
+        "With `conditional` the pages that didn't change since the last update aren't parsed again."
+        return extractors.ExtractorParams(
             chapter_url=self.chapter_url,
             chapter_number_selector=self.chapter_number_selector,
             chapter_number_regex=self.chapter_number_regex,
@@ -151,25 +421,115 @@ class ManhwaBookmark(models.Model):
             url_selector=self.url_selector,
             title_selector=self.title_selector,
             description_selector=self.description_selector,
+            url=self.url,
+            chapter_page_validators=self.get_page_validators('chapter_page') if conditional else None,
+            main_page_validators=self.get_page_validators('main_page') if conditional else None,
+            refresh_main_page=not conditional or self.needs_main_page_refresh(),
         )
+
+    def get_extractor_instance(self, conditional: bool = True,
+            parse_executor: Executor | None = None) -> extractors.Extractor:
+        """
+        With `parse_executor` the pages are parsed in its worker processes when the backend can load raw pages.
+        Replays are never conditional, the archived pages are parsed even if they didn't change.
+        """
         backend = self.get_extractor_backend()
-        return extractor_class(backend, params)
-
-    def update_bookmark(self, save=True) -> Self:
-        extractor = self.get_extractor_instance()
-        extractor_result = extractor()
-        self.url = extractor_result.url
-        self.title = extractor_result.title
-        self.description = extractor_result.description
-        self.chapter_number = extractor_result.chapter_number
-        self.next_chapter_url = extractor_result.next_chapter_url
-        is_modified = self.is_modified_for_update()
+        params = self.get_extractor_params(conditional and archives.archive_mode.archive is None)
+        if parse_executor is not None and isinstance(backend, extractors.ParserBackend):
+            return extractors.ProcessPoolExtractor(backend, params, parse_executor)
+        return self.get_extractor_class()(backend, params)
+
+    def get_async_extractor_instance(self, client: httpx.AsyncClient,
+            parse_executor: Executor | None = None) -> extractors.AsyncSimpleExtractor | None:
+        "Returns None when the extractor type has no async backend, or when an archive is replayed."
+        backend_class = ASYNC_EXTRACTOR_BACKEND_TYPES.get(ExtractorType(self.extractor_type))
+        if backend_class is None or archives.archive_mode.archive is not None:
+            return None
+        backend = backend_class(client, caches.response_cache)
+        if parse_executor is not None:
+            return extractors.AsyncProcessPoolExtractor(backend, self.get_extractor_params(), parse_executor)
+        return extractors.AsyncSimpleExtractor(backend, self.get_extractor_params())
+
+    def update_bookmark(self, save=True, conditional=True) -> Self:
+        timings = metrics.BookmarkTimings(self.get_host(), self.extractor_type)
+        try:
+            with metrics.collect(timings):
+                extractor = self.get_extractor_instance(conditional)
+                return self.apply_extractor_result(extractor(), save=save)
+        except Exception as e:
+            timings.error = repr(e)
+            raise
+        finally:
+            metrics.record(self, timings)
+
+    def apply_extractor_result(self, extractor_result: extractors.ExtractorResult, save=True) -> Self:
+        with metrics.phase('compare'):
+            self.set_extractor_result(extractor_result)
+            is_modified = self.is_modified_for_update()
         can_modify = save and is_modified
-        print(f"Modifying bookmark {self.pk}:'{self.title or self.name}': {can_modify}")
+        logger.debug("Modifying bookmark %s:'%s': %s", self.pk, self.title or self.name, can_modify)
         if can_modify:
-            self.save()
+            with metrics.phase('save'):
+                if self.pk is None:
+                    self.save()
+                else:
+                    self.save(update_fields=self.get_dirty_fields() | {'priority', 'updated_at'})
         return self
 
+    def set_extractor_result(self, extractor_result: extractors.ExtractorResult) -> set[str]:
+        "Copies the extracted values to the bookmark. Returns the names of the fields that changed."
+        # deferred fields aren't loaded to compare them, they count as changed once they are set
+        old_values = {field: self.__dict__[field] for field in self.update_tracked_fields if field in self.__dict__}
+        self.set_page_validators('chapter_page', extractor_result.chapter_page_validators)
+        self.set_page_validators('main_page', extractor_result.main_page_validators)
+        if extractor_result.main_page_validators is not None:
+            self.main_page_checked_at = timezone.now()
+        if extractor_result.chapter_page_modified:
+            self.url = extractor_result.url
+            self.chapter_number = extractor_result.chapter_number
+            self.next_chapter_url = extractor_result.next_chapter_url
+        if extractor_result.main_page_modified:
+            self.title = extractor_result.title
+            self.description = extractor_result.description
+        return {
+            field for field in self.update_tracked_fields
+            if field in self.__dict__ and (field not in old_values or self.__dict__[field] != old_values[field])
+        }
+
+    def record_new_chapter(self, now: datetime) -> None:
+        "Updates the estimated release interval with the time since the previous chapter was detected."
+        if self.next_chapter_detected_at is not None:
+            interval = now - self.next_chapter_detected_at
+            # the estimation follows changes of the release schedule in a few chapters
+            if self.release_interval is not None:
+                interval = (self.release_interval + interval) / 2
+            self.release_interval = interval
+        self.next_chapter_detected_at = now
+        self.unchanged_checks = 0
+
+    def get_check_delay(self) -> timedelta:
+        """
+        Time until the next check: the estimated release interval split in MANHWABOOKMARKS_CHECKS_PER_RELEASE
+        checks. The delay doubles with every check after two releases were missed, for series that stopped.
+        """
+        min_delay = timedelta(seconds=app_settings.MIN_CHECK_INTERVAL)
+        max_delay = timedelta(seconds=app_settings.MAX_CHECK_INTERVAL)
+        checks_per_release = app_settings.CHECKS_PER_RELEASE
+        delay = self.release_interval / checks_per_release if self.release_interval else min_delay
+        missed_checks = self.unchanged_checks - 2 * checks_per_release
+        if missed_checks > 0:
+            delay *= 2 ** min(missed_checks, 16)
+        return min(max(delay, min_delay), max_delay)
+
+    def schedule_next_check(self, new_chapter: bool) -> None:
+        "Called after every check of the bookmark, `new_chapter` tells if the check found the next chapter."
+        now = timezone.now()
+        if new_chapter:
+            self.record_new_chapter(now)
+        else:
+            self.unchanged_checks += 1
+        self.next_check_at = now + self.get_check_delay()
+
     def mark_next_chapter_opened(self):
         if self.next_chapter_url:
             self.next_chapter_opened = True
@@ -180,5 +540,103 @@ class ManhwaBookmark(models.Model):
             self.chapter_url = self.next_chapter_url
             self.next_chapter_url = None
             self.next_chapter_opened = False
-            self.update_bookmark(save=False)
+            # the following chapter may already be out, the bookmark is checked in the next sweep
+            self.unchanged_checks = 0
+            self.next_check_at = None
+            self.update_bookmark(save=False, conditional=False)
             self.save()
+
+
+@receiver(post_save, sender=ManhwaBookmark)
+@receiver(post_delete, sender=ManhwaBookmark)
+def clear_template_cache(sender, instance: ManhwaBookmark, **kwargs):
+    if instance.is_template or caches.template_cache.is_cached(instance):
+        caches.template_cache.clear()
+
+
+class UpdateJobStatus(models.TextChoices):
+    PENDING = 'pending', _("Pending")
+    RUNNING = 'running', _("Running")
+    DONE = 'done', _("Done")
+    FAILED = 'failed', _("Failed")
+
+
+class UpdateJobManager(models.Manager['UpdateJob']):
+    def enqueue(self, bookmarks: Iterable[ManhwaBookmark], use_async: bool = False) -> 'UpdateJob':
+        job = self.create(use_async=use_async)
+        job.bookmarks.set(bookmarks)
+        return job
+
+    def active(self) -> models.QuerySet['UpdateJob']:
+        return self.filter(status__in=(UpdateJobStatus.PENDING, UpdateJobStatus.RUNNING))
+
+    def claim_next(self) -> Optional['UpdateJob']:
+        "Takes the oldest pending job. The status is changed with a conditional update, so a job is only taken once."
+        while (job := self.filter(status=UpdateJobStatus.PENDING).order_by('pk').first()) is not None:
+            started_at = timezone.now()
+            if self.filter(pk=job.pk, status=UpdateJobStatus.PENDING).update(
+                    status=UpdateJobStatus.RUNNING, started_at=started_at):
+                job.status = UpdateJobStatus.RUNNING
+                job.started_at = started_at
+                return job
+        return None
+
+
+class UpdateJob(models.Model):
+    "Bookmarks queued to be updated by the process_update_jobs command."
+    objects = UpdateJobManager()
+
+    status = models.CharField(_("Status"), max_length=20, choices=UpdateJobStatus.choices,
+        default=UpdateJobStatus.PENDING)
+    use_async = models.BooleanField(_("Use async crawler"), default=False)
+    bookmarks = models.ManyToManyField(ManhwaBookmark, related_name='update_jobs', verbose_name=_("Bookmarks"))
+
+    total = models.PositiveIntegerField(_("Total"), default=0)
+    processed = models.PositiveIntegerField(_("Processed"), default=0)
+    updated = models.PositiveIntegerField(_("Updated"), default=0)
+    errors = models.PositiveIntegerField(_("Errors"), default=0)
+    error = models.TextField(_("Error"), blank=True)
+
+    created_at = models.DateTimeField(_("Created at"), auto_now_add=True)
+    started_at = models.DateTimeField(_("Started at"), blank=True, null=True)
+    finished_at = models.DateTimeField(_("Finished at"), blank=True, null=True)
+
+    class Meta:
+        verbose_name = _("Update job")
+        verbose_name_plural = _("Update jobs")
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return f'{self._meta.verbose_name} {self.pk}'
+
+    @property
+    def progress_percent(self) -> int:
+        if not self.total:
+            return 100 if self.status == UpdateJobStatus.DONE else 0
+        return (self.processed + self.errors) * 100 // self.total
+
+    def set_stats(self, stats: crawler.CrawlStats) -> None:
+        self.total = stats.total
+        self.processed = stats.processed
+        self.updated = stats.updated
+        self.errors = stats.errors
+
+    def report_progress(self, stats: crawler.CrawlStats) -> None:
+        self.set_stats(stats)
+        self.save(update_fields=('total', 'processed', 'updated', 'errors'))
+
+    def run(self) -> crawler.CrawlStats | None:
+        "Returns the stats of the sweep, None when it failed."
+        stats = None
+        try:
+            stats = self.bookmarks.all().update_bookmarks(use_async=self.use_async, progress=self.report_progress)
+        except Exception as e:
+            logger.exception('%s failed', self)
+            self.status = UpdateJobStatus.FAILED
+            self.error = repr(e)
+        else:
+            self.set_stats(stats)
+            self.status = UpdateJobStatus.DONE
+        self.finished_at = timezone.now()
+        self.save()
+        return stats
@@ -0,0 +1,145 @@
+from typing import Iterator
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+import requests
+import mechanicalsoup
+
+from .conf import app_settings
+
+
+@dataclass
+class SessionPoolStats:
+    sessions_created: int = 0
+    sessions_reused: int = 0
+    connections_opened: int = 0
+    requests: int = 0
+
+    @property
+    def connections_reused(self) -> int:
+        return max(self.requests - self.connections_opened, 0)
+
+    def __sub__(self, other: 'SessionPoolStats') -> 'SessionPoolStats':
+        "The counters since `other` was taken."
+        return SessionPoolStats(
+            sessions_created=self.sessions_created - other.sessions_created,
+            sessions_reused=self.sessions_reused - other.sessions_reused,
+            connections_opened=self.connections_opened - other.connections_opened,
+            requests=self.requests - other.requests,
+        )
+
+    def __str__(self):
+        return (
+            f'{self.sessions_created} sessions created, {self.sessions_reused} reused; '
+            f'{self.requests} requests over {self.connections_opened} connections '
+            f'({self.connections_reused} reused)'
+        )
+
+
+class SessionPool:
+    """
+    Thread-safe pool of keep-alive `requests` sessions grouped by host.
+
+    A session is borrowed by one thread at a time and goes back to the idle sessions of its host when
+    returned, so the connections it keeps open are reused by the next bookmark of the same host. At most
+    `max_idle_per_host` sessions are kept per host, by default the MANHWABOOKMARKS_HOST_CONCURRENCY
+    setting.
+    """
+    user_agent: str
+    max_idle_per_host: int | None
+
+    def __init__(self, max_idle_per_host: int | None = None, user_agent: str | None = None):
+        self.max_idle_per_host = max_idle_per_host
+        self.user_agent = user_agent or (
+            f'{requests.utils.default_user_agent()} (MechanicalSoup/{mechanicalsoup.__version__})')
+        self._lock = threading.Lock()
+        self._idle: defaultdict[str, list[requests.Session]] = defaultdict(list)
+        self._sessions_created = 0
+        self._sessions_reused = 0
+        # connection counters of the sessions already closed
+        self._closed_connections = 0
+        self._closed_requests = 0
+
+    def get_max_idle(self) -> int:
+        return self.max_idle_per_host or app_settings.HOST_CONCURRENCY
+
+    def create_session(self) -> requests.Session:
+        session = requests.Session()
+        session.headers['User-Agent'] = self.user_agent
+        return session
+
+    @contextmanager
+    def session(self, url: str) -> Iterator[requests.Session]:
+        host = urlparse(url).netloc
+        with self._lock:
+            idle = self._idle[host]
+            if idle:
+                session = idle.pop()
+                self._sessions_reused += 1
+            else:
+                session = None
+                self._sessions_created += 1
+        if session is None:
+            session = self.create_session()
+        try:
+            yield session
+        finally:
+            with self._lock:
+                idle = self._idle[host]
+                keep = len(idle) < self.get_max_idle()
+                if keep:
+                    idle.append(session)
+                else:
+                    self._add_closed_counters(session)
+            if not keep:
+                session.close()
+
+    @staticmethod
+    def _connection_counters(session: requests.Session) -> tuple[int, int]:
+        connections = requests_count = 0
+        for adapter in session.adapters.values():
+            poolmanager = getattr(adapter, 'poolmanager', None)
+            if poolmanager is None:
+                continue
+            for key in poolmanager.pools.keys():
+                pool = poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                connections += pool.num_connections
+                requests_count += pool.num_requests
+        return connections, requests_count
+
+    def _add_closed_counters(self, session: requests.Session) -> None:
+        connections, requests_count = self._connection_counters(session)
+        self._closed_connections += connections
+        self._closed_requests += requests_count
+
+    def stats(self) -> SessionPoolStats:
+        with self._lock:
+            stats = SessionPoolStats(
+                sessions_created=self._sessions_created,
+                sessions_reused=self._sessions_reused,
+                connections_opened=self._closed_connections,
+                requests=self._closed_requests,
+            )
+            for sessions in self._idle.values():
+                for session in sessions:
+                    connections, requests_count = self._connection_counters(session)
+                    stats.connections_opened += connections
+                    stats.requests += requests_count
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            sessions = [session for idle in self._idle.values() for session in idle]
+            for session in sessions:
+                self._add_closed_counters(session)
+            self._idle.clear()
+        for session in sessions:
+            session.close()
+
+
+session_pool = SessionPool()
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+
+# sent once the update of a bookmark finished, with the `bookmark` and its `timings` (metrics.BookmarkTimings)
+bookmark_timed = Signal()
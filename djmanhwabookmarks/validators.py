@@ -5,16 +5,18 @@ import soupsieve
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
+from .caches import compile_css, compile_regex
+
 
 def validate_selector_syntax(value):
     try:
-        soupsieve.compile(value)
+        compile_css(value)
     except soupsieve.util.SelectorSyntaxError:
         raise ValidationError(_("Invalid css selector syntax."))
 
 
 def validate_regex_syntax(value):
     try:
-        re.compile(value)
+        compile_regex(value)
     except re.error:
         raise ValidationError(_("Invalid regular expression syntax."))
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_admin
+----------
+
+Tests for `dj-manhwabookmarks` admin module.
+"""
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from djmanhwabookmarks import models
+
+
+class TestManhwaBookmarkAdmin(TestCase):
+    def setUp(self):
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.force_login(user)
+        self.bookmark = models.ManhwaBookmark.objects.create(name='Foo', chapter_url='http://127.0.0.1:1/foo/1')
+
+    def test_update_action_queues_a_job(self):
+        response = self.client.post(reverse('admin:djmanhwabookmarks_manhwabookmark_changelist'), {
+            'action': 'update_bookmarks',
+            '_selected_action': [self.bookmark.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        job = models.UpdateJob.objects.get()
+        self.assertEqual(job.status, models.UpdateJobStatus.PENDING)
+        self.assertEqual(list(job.bookmarks.all()), [self.bookmark])
+
+    def test_change_list_polls_the_jobs(self):
+        response = self.client.get(reverse('admin:djmanhwabookmarks_manhwabookmark_changelist'))
+        self.assertContains(response, reverse('admin:bookmark-update-jobs'))
+
+    def test_update_jobs_polling(self):
+        job = models.UpdateJob.objects.enqueue(models.ManhwaBookmark.objects.all())
+        response = self.client.get(reverse('admin:bookmark-update-jobs'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, str(job))
+        models.UpdateJob.objects.filter(pk=job.pk).update(status=models.UpdateJobStatus.DONE)
+        # htmx stops polling once there are no active jobs
+        self.assertEqual(self.client.get(reverse('admin:bookmark-update-jobs')).status_code, 286)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_archives
+-------------
+
+Tests for `dj-manhwabookmarks` archives module.
+"""
+
+import json
+import os
+import tempfile
+from io import StringIO
+
+import httpx
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+
+from djmanhwabookmarks import archives, crawler, extractors, metrics, models
+
+from .test_crawler import CHAPTER_PAGE, SERIES_PAGE, BookmarkFixturesMixin, handler
+
+
+class TemporaryArchiveMixin:
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'pages.archive')
+
+    def write_archive(self) -> None:
+        writer = archives.ArchiveWriter(self.path)
+        writer.add('https://example.com/series/foo/12', 200, {'Content-Type': 'text/html'}, CHAPTER_PAGE)
+        writer.add('https://example.com/series/foo', 200, {'Content-Type': 'text/html; charset=utf-8'}, SERIES_PAGE)
+        writer.close()
+
+
+class TestResponseArchive(TemporaryArchiveMixin, SimpleTestCase):
+    def test_round_trip(self):
+        self.write_archive()
+        archive = archives.ResponseArchive(self.path)
+        self.addCleanup(archive.close)
+        self.assertEqual(len(archive), 2)
+        self.assertIn('https://EXAMPLE.com:443/series/foo#summary', archive)
+        response = archive.get('https://example.com/series/foo')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, SERIES_PAGE)
+        self.assertEqual(response.headers['content-type'], 'text/html; charset=utf-8')
+        self.assertEqual(response.encoding, 'utf-8')
+        self.assertIsNone(archive.get('https://example.com/series/bar'))
+
+    def test_unclosed_archive_is_rejected(self):
+        writer = archives.ArchiveWriter(self.path)
+        writer.add('https://example.com/series/foo', 200, {}, SERIES_PAGE)
+        writer._file.flush()
+        with self.assertRaises(ValueError):
+            archives.ResponseArchive(self.path)
+        writer.close()
+
+    def test_replay_backends_extract_archived_pages(self):
+        self.write_archive()
+        archive = archives.ResponseArchive(self.path)
+        self.addCleanup(archive.close)
+        for backend_class in (extractors.ReplaySoupExtractorBackend, extractors.ReplayLXmlExtractorBackend):
+            backend = backend_class(archive)
+            validators = backend.open('https://example.com/series/foo')
+            self.assertEqual(backend.get_text_content('h1'), 'Foo')
+            backend.open('https://example.com/series/foo/12')
+            self.assertEqual(backend.get_text_content('span.chapter'), 'Chapter 12')
+            # replays don't skip unchanged pages, each one is parsed again
+            self.assertTrue(backend.open('https://example.com/series/foo', validators).modified)
+            self.assertEqual(backend.get_text_content('h1'), 'Foo')
+            with self.assertRaises(extractors.ArchiveMissError):
+                backend.open('https://example.com/series/bar')
+
+
+class TestRecordAndReplay(TemporaryArchiveMixin, BookmarkFixturesMixin, TestCase):
+    def test_replayed_sweep_matches_recorded_sweep(self):
+        bookmark = self.create_bookmark(12)
+        with archives.archive_mode.record(self.path) as writer:
+            crawler.AsyncCrawler(transport=httpx.MockTransport(handler)).crawl(models.ManhwaBookmark.objects.all())
+            self.assertEqual(len(writer), 2)
+        self.assertIsNone(archives.archive_mode.writer)
+
+        # the stored validators match the archived pages, they must not skip the parse of the replay
+        models.ManhwaBookmark.objects.update(next_chapter_url=None, url=None, title='', description='')
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+        with archives.archive_mode.replay(archives.ResponseArchive(self.path)):
+            self.assertIsNone(models.ManhwaBookmark.objects.get().get_async_extractor_instance(httpx.AsyncClient()))
+            stats = crawler.ThreadPoolCrawler(1).crawl(models.ManhwaBookmark.objects.all())
+        self.assertEqual((stats.processed, stats.errors), (1, 0))
+        phases = {phase for _, _, phase in metrics.registry.phase_seconds()}
+        self.assertIn('parse', phases)
+        bookmark.refresh_from_db()
+        self.assertEqual(bookmark.next_chapter_url, 'https://example.com/series/foo/13')
+        self.assertEqual(bookmark.title, 'Foo')
+        self.assertEqual(bookmark.description, 'A manhwa about foo.')
+
+    def test_replay_command(self):
+        self.create_bookmark(12)
+        self.create_bookmark(13, extractor_type=models.ExtractorType.LXML)
+        self.write_archive()
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('update_bookmarks', '--all', '--replay', self.path, stdout=out)
+        summary = json.loads(out.getvalue().splitlines()[-1])
+        # the chapter 13 page wasn't recorded
+        self.assertEqual((summary['processed'], summary['errors']), (1, 1))
+        self.assertIsNone(archives.archive_mode.archive)
+
+        with self.assertRaises(CommandError):
+            call_command('update_bookmarks', '--replay', os.path.join(os.path.dirname(self.path), 'missing'))
+
+    def test_replay_command_parses_in_processes(self):
+        self.write_archive()
+        for extractor_type in (models.ExtractorType.MECHANICAL_SOUP, models.ExtractorType.LXML):
+            bookmark = self.create_bookmark(12, extractor_type=extractor_type)
+            out = StringIO()
+            call_command('update_bookmarks', '--all', '--replay', self.path, '--parse-workers', '1', stdout=out)
+            summary = json.loads(out.getvalue().splitlines()[-1])
+            self.assertEqual((summary['processed'], summary['errors']), (1, 0))
+            bookmark.refresh_from_db()
+            self.assertEqual(bookmark.next_chapter_url, 'https://example.com/series/foo/13')
+            self.assertEqual(bookmark.title, 'Foo')
+            bookmark.delete()
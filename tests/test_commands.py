@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_commands
+-------------
+
+Tests for `dj-manhwabookmarks` management commands.
+"""
+
+import contextlib
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from djmanhwabookmarks import caches, models
+
+from .test_crawler import BookmarkFixturesMixin
+
+
+class TestUpdateBookmarksCommand(BookmarkFixturesMixin, TestCase):
+    def call_command(self, *args, failures: bool = False) -> dict:
+        "With `failures` the command must fail because some bookmark wasn't updated."
+        stdout = StringIO()
+        if failures:
+            with self.assertRaisesMessage(CommandError, 'failed to update'):
+                call_command('update_bookmarks', *args, stdout=stdout)
+        else:
+            call_command('update_bookmarks', *args, stdout=stdout)
+        return json.loads(stdout.getvalue().splitlines()[-1])
+
+    def test_shards_split_the_bookmarks(self):
+        pks = [self.create_bookmark(number).pk for number in range(5)]
+        shards = [set(models.ManhwaBookmark.objects.shard(index, 2).values_list('pk', flat=True)) for index in range(2)]
+        self.assertEqual(shards[0] | shards[1], set(pks))
+        self.assertFalse(shards[0] & shards[1])
+
+    def test_summary(self):
+        # nothing listens on port 1, the update fails without waiting
+        bookmark = self.create_bookmark(12, chapter_url='http://127.0.0.1:1/series/foo/12')
+        self.create_bookmark(13, extractor_type=models.ExtractorType.LXML)
+        summary = self.call_command('--extractor-type', 'mechanical_soup', '--shard', f'{bookmark.pk % 3}/3',
+            failures=True)
+        self.assertEqual(summary['shard'], f'{bookmark.pk % 3}/3')
+        self.assertEqual(summary['extractor_types'], ['mechanical_soup'])
+        self.assertEqual((summary['total'], summary['processed'], summary['errors']), (1, 0, 1))
+        self.assertIn('elapsed', summary)
+
+    def test_metrics_file(self):
+        self.create_bookmark(12, chapter_url='http://127.0.0.1:1/series/foo/12')
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'metrics.prom'
+            self.call_command('--metrics-file', str(path), failures=True)
+            dump = path.read_text()
+        self.assertIn('# TYPE djmanhwabookmarks_phase_seconds summary', dump)
+        self.assertIn('djmanhwabookmarks_bookmarks_total{host="127.0.0.1:1",backend="mechanical_soup",outcome="error"}',
+            dump)
+
+    def test_report_is_written_by_the_command(self):
+        self.create_bookmark(12, chapter_url='http://127.0.0.1:1/series/foo/12')
+        out = StringIO()
+        with contextlib.redirect_stdout(StringIO()) as process_stdout, self.assertLogs('djmanhwabookmarks.crawler'):
+            self.assertRaises(CommandError, call_command, 'update_bookmarks', stdout=out)
+        self.assertEqual(process_stdout.getvalue(), '')
+        self.assertIn('pages served from the response cache', out.getvalue())
+        self.assertIn('sessions created', out.getvalue())
+
+    def test_invalid_shard(self):
+        with self.assertRaises(CommandError):
+            self.call_command('--shard', '2/2')
+
+
+class TestProcessUpdateJobsCommand(BookmarkFixturesMixin, TestCase):
+    def test_once_runs_the_pending_jobs(self):
+        self.create_bookmark(12, chapter_url='http://127.0.0.1:1/series/foo/12')
+        job = models.UpdateJob.objects.enqueue(models.ManhwaBookmark.objects.all())
+        stdout = StringIO()
+        call_command('process_update_jobs', '--once', stdout=stdout)
+        job.refresh_from_db()
+        self.assertEqual(job.status, models.UpdateJobStatus.DONE)
+        self.assertIn(f'{job}: Done, 0/1 processed', stdout.getvalue())
+
+
+class TestImportBookmarksCommand(TestCase):
+    def setUp(self):
+        caches.template_cache.clear()
+        self.addCleanup(caches.template_cache.clear)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name: str, content: str) -> str:
+        path = Path(self.directory.name) / name
+        path.write_text(content)
+        return str(path)
+
+    def test_import_csv(self):
+        models.ManhwaBookmark.objects.create(
+            name='Example', chapter_url='https://example.com/template', is_template=True, title_selector='h1')
+        models.ManhwaBookmark.objects.create(name='Existing', chapter_url='https://example.com/existing/1')
+        path = self.write('bookmarks.csv', (
+            'name,chapter_url\n'
+            'Foo,https://example.com/foo/1\n'
+            'Bar,https://other.com/bar/1\n'
+            'Existing,https://example.com/existing/2\n'
+            'Baz,not a url\n'
+        ))
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_bookmarks', path, stdout=stdout, stderr=stderr)
+        self.assertIn('2 bookmarks imported, 2 skipped', stdout.getvalue())
+        self.assertEqual(models.ManhwaBookmark.objects.get(name='Foo').title_selector, 'h1')
+        self.assertEqual(models.ManhwaBookmark.objects.get(name='Bar').host, 'other.com')
+        job = models.UpdateJob.objects.get()
+        self.assertTrue(job.use_async)
+        self.assertEqual(sorted(job.bookmarks.values_list('name', flat=True)), ['Bar', 'Foo'])
+
+    def test_import_json_queries(self):
+        entries = [{'name': f'Foo {number}', 'chapter_url': f'https://host{number % 5}.com/foo/{number}'}
+            for number in range(20)]
+        path = self.write('bookmarks.json', json.dumps(entries))
+        # existing bookmarks, templates, insert
+        with self.assertNumQueries(3):
+            call_command('import_bookmarks', path, '--no-scrape', stdout=StringIO())
+        self.assertEqual(models.ManhwaBookmark.objects.count(), 20)
+        self.assertFalse(models.UpdateJob.objects.exists())
+
+    def test_import_batches(self):
+        models.ManhwaBookmark.objects.create(name='Foo 4', chapter_url='https://example.com/existing/4')
+        entries = [{'name': f'Foo {number}', 'chapter_url': f'https://example.com/foo/{number}'}
+            for number in range(5)]
+        entries.append({'name': 'x' * 256, 'chapter_url': 'https://example.com/foo/long'})
+        # existing bookmarks and inserts by batches of 2, the templates were loaded by the first create
+        with self.assertNumQueries(5):
+            result = models.ManhwaBookmark.objects.import_bookmarks(entries, scrape=False, batch_size=2)
+        self.assertEqual(len(result.created), 4)
+        self.assertEqual([reason for _, _, reason in result.skipped],
+            ['Name or chapter url too long', 'Already exists'])
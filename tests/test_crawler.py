@@ -0,0 +1,453 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_crawler
+------------
+
+Tests for `dj-manhwabookmarks` crawler module.
+"""
+
+import threading
+from unittest import mock
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import httpx
+from asgiref.sync import async_to_sync
+
+from django.db import DatabaseError
+from django.test import TestCase
+from django.utils import timezone
+
+from djmanhwabookmarks import models
+from djmanhwabookmarks import browsers
+from djmanhwabookmarks import caches
+from djmanhwabookmarks import crawler
+from djmanhwabookmarks import extractors
+from djmanhwabookmarks import metrics
+from djmanhwabookmarks.conf import app_settings
+
+
+CHAPTER_PAGE = b'''
+<html><body>
+<span class="chapter">Chapter 12</span>
+<a class="series" href="/series/foo">Foo</a>
+<a class="next" href="/series/foo/13">Next</a>
+</body></html>
+'''
+
+SERIES_PAGE = b'''
+<html><body>
+<h1>Foo</h1>
+<div class="summary"> A manhwa about foo. </div>
+</body></html>
+'''
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path.startswith('/series/foo/'):
+        return httpx.Response(200, content=CHAPTER_PAGE, headers={'Content-Type': 'text/html'})
+    return httpx.Response(200, content=SERIES_PAGE, headers={'Content-Type': 'text/html'})
+
+
+class PagesHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = CHAPTER_PAGE if self.path.startswith('/series/foo/') else SERIES_PAGE
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BookmarkFixturesMixin:
+    def create_bookmark(self, number: int, **kwargs) -> models.ManhwaBookmark:
+        fields = dict(
+            name=f'Foo {number}',
+            chapter_url=f'https://example.com/series/foo/{number}',
+            chapter_number_selector='span.chapter',
+            chapter_number_regex=r'(\d+)',
+            next_chapter_url_selector='a.next',
+            url_selector='a.series',
+            title_selector='h1',
+            description_selector='div.summary',
+        )
+        fields.update(kwargs)
+        return models.ManhwaBookmark.objects.create(**fields)
+
+
+class TestAsyncCrawler(BookmarkFixturesMixin, TestCase):
+    def test_crawl_updates_bookmarks(self):
+        bookmark = self.create_bookmark(12)
+        stats = crawler.AsyncCrawler(transport=httpx.MockTransport(handler)).crawl(
+            models.ManhwaBookmark.objects.all())
+        self.assertEqual(stats.total, 1)
+        self.assertEqual(stats.processed, 1)
+        self.assertEqual(stats.errors, 0)
+        bookmark.refresh_from_db()
+        self.assertEqual(bookmark.chapter_number, 12)
+        self.assertEqual(bookmark.next_chapter_url, 'https://example.com/series/foo/13')
+        self.assertEqual(bookmark.url, 'https://example.com/series/foo')
+        self.assertEqual(bookmark.title, 'Foo')
+        self.assertEqual(bookmark.description, 'A manhwa about foo.')
+
+    def test_crawl_parses_pages_in_processes(self):
+        bookmark = self.create_bookmark(12)
+        stats = crawler.AsyncCrawler(transport=httpx.MockTransport(handler), parse_workers=1).crawl(
+            models.ManhwaBookmark.objects.all())
+        self.assertEqual((stats.processed, stats.updated, stats.errors), (1, 1, 0))
+        bookmark.refresh_from_db()
+        self.assertEqual(bookmark.next_chapter_url, 'https://example.com/series/foo/13')
+        self.assertEqual(bookmark.description, 'A manhwa about foo.')
+
+    def test_crawl_counts_errors(self):
+        def failing_handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError('unreachable')
+
+        self.create_bookmark(12)
+        stats = crawler.AsyncCrawler(transport=httpx.MockTransport(failing_handler)).crawl(
+            models.ManhwaBookmark.objects.all())
+        self.assertEqual(stats.processed, 0)
+        self.assertEqual(stats.errors, 1)
+
+    def test_failed_bookmarks_back_off(self):
+        def failing_handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError('unreachable')
+
+        bookmark = self.create_bookmark(12, unchanged_checks=2 * app_settings.CHECKS_PER_RELEASE)
+        crawler.AsyncCrawler(transport=httpx.MockTransport(failing_handler)).crawl(
+            models.ManhwaBookmark.objects.all())
+        bookmark.refresh_from_db()
+        self.assertEqual(bookmark.unchanged_checks, 2 * app_settings.CHECKS_PER_RELEASE + 1)
+        self.assertGreaterEqual(bookmark.next_check_at - timezone.now(),
+            timedelta(seconds=app_settings.MIN_CHECK_INTERVAL * 1.9))
+        self.assertFalse(models.ManhwaBookmark.objects.due_for_check().exists())
+
+    def test_crawl_consumes_bookmarks_lazily(self):
+        def series_handler(request: httpx.Request) -> httpx.Response:
+            series = request.url.path.split('/')[1]
+            if request.url.path.count('/') == 1:
+                return httpx.Response(200, content=SERIES_PAGE)
+            return httpx.Response(200, content=CHAPTER_PAGE.replace(b'/series/foo', f'/{series}'.encode()))
+
+        for series in ('foo', 'bar', 'baz'):
+            self.create_bookmark(12, name=series, chapter_url=f'https://example.com/{series}/12')
+        read = []
+
+        def bookmarks():
+            for bookmark in models.ManhwaBookmark.objects.order_by('pk').iterator(chunk_size=1):
+                read.append(bookmark.name)
+                yield bookmark
+
+        async_crawler = crawler.AsyncCrawler(transport=httpx.MockTransport(series_handler), chunk_size=1, window=1)
+        stats = async_crawler.crawl(bookmarks())
+        self.assertEqual((stats.total, stats.updated, stats.errors), (3, 3, 0))
+        self.assertEqual(read, ['foo', 'bar', 'baz'])
+
+
+class TestThreadPoolCrawler(BookmarkFixturesMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), PagesHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def test_crawl_updates_bookmarks(self):
+        host = f'127.0.0.1:{self.server.server_port}'
+        bookmark = self.create_bookmark(12, chapter_url=f'http://{host}/series/foo/12')
+        stats = models.ManhwaBookmark.objects.update_bookmarks()
+        self.assertEqual((stats.processed, stats.updated, stats.errors), (1, 1, 0))
+        bookmark.refresh_from_db()
+        self.assertEqual(bookmark.chapter_number, 12)
+        self.assertEqual(bookmark.next_chapter_url, f'http://{host}/series/foo/13')
+        self.assertEqual(bookmark.title, 'Foo')
+        self.assertEqual(bookmark.priority, 1)
+
+    def test_update_bookmarks_parses_pages_in_processes(self):
+        host = f'127.0.0.1:{self.server.server_port}'
+        bookmark = self.create_bookmark(12, chapter_url=f'http://{host}/series/foo/12', extractor_type='lxml')
+        stats = models.ManhwaBookmark.objects.update_bookmarks(parse_workers=2)
+        self.assertEqual((stats.processed, stats.updated, stats.errors), (1, 1, 0))
+        bookmark.refresh_from_db()
+        self.assertEqual(bookmark.chapter_number, 12)
+        self.assertEqual(bookmark.title, 'Foo')
+
+    def test_update_bookmarks_streams_only_crawl_fields(self):
+        host = f'127.0.0.1:{self.server.server_port}'
+        bookmark = self.create_bookmark(12, chapter_url=f'http://{host}/series/foo/12')
+        # count, select and update: the deferred description is never loaded. The test transaction adds the
+        # savepoint around the update
+        with self.assertNumQueries(5):
+            stats = models.ManhwaBookmark.objects.update_bookmarks(chunk_size=1)
+        self.assertEqual((stats.total, stats.updated), (1, 1))
+        bookmark.refresh_from_db()
+        self.assertEqual(bookmark.description, 'A manhwa about foo.')
+
+
+class TestHostScheduler(BookmarkFixturesMixin, TestCase):
+    def test_host_concurrency(self):
+        scheduler = crawler.HostScheduler(
+            concurrency=2, host_limits={'slow.com': crawler.HostLimits(concurrency=1)})
+        self.assertTrue(scheduler.try_acquire('slow.com'))
+        self.assertFalse(scheduler.try_acquire('slow.com'))
+        self.assertTrue(scheduler.try_acquire('example.com'))
+        self.assertTrue(scheduler.try_acquire('example.com'))
+        self.assertFalse(scheduler.try_acquire('example.com'))
+        scheduler.release('slow.com')
+        self.assertTrue(scheduler.try_acquire('slow.com'))
+
+    def test_host_rate(self):
+        scheduler = crawler.HostScheduler(rate=2)
+        self.assertEqual(scheduler.reserve_start('example.com'), 0)
+        self.assertAlmostEqual(scheduler.reserve_start('example.com'), 0.5, places=2)
+        self.assertAlmostEqual(scheduler.reserve_start('example.com'), 1.0, places=2)
+        self.assertEqual(scheduler.reserve_start('other.com'), 0)
+
+
+class TestConditionalFetch(BookmarkFixturesMixin, TestCase):
+    def test_unchanged_pages_are_not_parsed_again(self):
+        requests = []
+
+        def etag_handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            etag = '"chapter"' if request.url.path.startswith('/series/foo/') else '"series"'
+            if request.headers.get('If-None-Match') == etag:
+                return httpx.Response(304)
+            response = handler(request)
+            response.headers['ETag'] = etag
+            return response
+
+        bookmark = self.create_bookmark(12)
+        transport = httpx.MockTransport(etag_handler)
+        crawler.AsyncCrawler(transport=transport).crawl(models.ManhwaBookmark.objects.all())
+        bookmark.refresh_from_db()
+        self.assertEqual(bookmark.chapter_page_etag, '"chapter"')
+        self.assertEqual(bookmark.main_page_etag, '"series"')
+        self.assertTrue(bookmark.chapter_page_hash)
+        updated_at = bookmark.updated_at
+
+        models.ManhwaBookmark.objects.filter(pk=bookmark.pk).update(next_chapter_url=None)
+        crawler.AsyncCrawler(transport=transport).crawl(models.ManhwaBookmark.objects.all())
+        # the chapter page answered 304, so the series page isn't requested
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(requests[-1].headers['If-None-Match'], '"chapter"')
+        bookmark.refresh_from_db()
+        self.assertEqual(bookmark.updated_at, updated_at)
+        self.assertEqual(bookmark.title, 'Foo')
+
+
+class TestBrowserPool(BookmarkFixturesMixin, TestCase):
+    def test_only_crawler_threads_use_the_pool(self):
+        bookmark = models.ManhwaBookmark(name='Foo', chapter_url='https://example.com/series/foo/12',
+            extractor_type=models.ExtractorType.PLAYWRIGHT)
+        self.assertIsNone(bookmark.get_extractor_backend_kwargs()['browser_pool'])
+        threads: list[int] = []
+        with ThreadPoolExecutor(1, initializer=crawler.start_worker_thread, initargs=(threads,)) as executor:
+            self.assertIs(executor.submit(bookmark.get_extractor_backend_kwargs).result()['browser_pool'],
+                crawler.browser_pool)
+            crawler.release_thread_resources(executor, len(threads))
+            self.assertIsNone(executor.submit(bookmark.get_extractor_backend_kwargs).result()['browser_pool'])
+
+    def test_failed_crawls_release_the_browsers(self):
+        def failing_handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError('unreachable')
+
+        # nothing listens on port 1, the update fails and the write of its next check fails too
+        self.create_bookmark(12, chapter_url='http://127.0.0.1:1/series/foo/12')
+        for crawler_instance in (crawler.ThreadPoolCrawler(1, batch_size=1),
+                crawler.AsyncCrawler(transport=httpx.MockTransport(failing_handler), batch_size=1)):
+            with mock.patch.object(crawler.BulkWriter, 'write', side_effect=DatabaseError), \
+                    mock.patch.object(crawler, 'release_thread_resources',
+                        wraps=crawler.release_thread_resources) as release, \
+                    self.assertLogs('djmanhwabookmarks.crawler', 'WARNING'), self.assertRaises(DatabaseError):
+                crawler_instance.crawl(models.ManhwaBookmark.objects.all())
+            release.assert_called_once()
+
+
+class TestSweepStats(TestCase):
+    def test_stats_are_reported_per_sweep(self):
+        browsers.readiness_stats.record('https://slow.com/1', 2.0, timed_out=True)
+        browsers.resource_blocking_stats.record('image')
+        models.ManhwaBookmark.objects.update_bookmarks()
+        self.assertEqual(browsers.readiness_stats.hosts(), {})
+        self.assertEqual(browsers.resource_blocking_stats.estimated_bytes_saved(), 0)
+
+    def test_report_covers_the_sweep(self):
+        timings = metrics.BookmarkTimings('earlier.com', 'mechanical_soup')
+        timings.phases['download'] = 1.0
+        metrics.registry.observe(timings)
+        self.addCleanup(metrics.registry.clear)
+        stats = models.ManhwaBookmark.objects.update_bookmarks()
+        self.assertIn('Slowest hosts: none\nSlowest selectors: none', stats.report)
+        self.assertIn('0 sessions created, 0 reused; 0 requests over 0 connections (0 reused)', stats.report)
+
+
+class TestResponseDeduplication(BookmarkFixturesMixin, TestCase):
+    def test_shared_pages_are_downloaded_once_per_sweep(self):
+        requested_paths = []
+
+        def counting_handler(request: httpx.Request) -> httpx.Response:
+            requested_paths.append(request.url.path)
+            return handler(request)
+
+        async def open_pages() -> None:
+            async with httpx.AsyncClient(transport=httpx.MockTransport(counting_handler)) as client:
+                for url in ('https://example.com/series/foo', 'https://Example.com/series/foo#summary'):
+                    backend = extractors.AsyncSoupExtractorBackend(client, caches.response_cache)
+                    await backend.open(url)
+                    self.assertEqual(backend.get_text_content('h1'), 'Foo')
+
+        with caches.response_cache.sweep():
+            async_to_sync(open_pages)()
+        self.assertEqual(requested_paths, ['/series/foo'])
+        self.assertEqual(caches.response_cache.dedup_ratio(), 0.5)
+        # outside a sweep every page is downloaded
+        async_to_sync(open_pages)()
+        self.assertEqual(len(requested_paths), 3)
+
+    def test_chapter_page_that_is_the_series_page_is_fetched_once(self):
+        requested_paths = []
+
+        def series_handler(request: httpx.Request) -> httpx.Response:
+            requested_paths.append(request.url.path)
+            return httpx.Response(200, content=CHAPTER_PAGE.replace(b'/series/foo"', b'/series/foo/12#top"'))
+
+        bookmark = self.create_bookmark(12, title_selector='span.chapter')
+        crawler.AsyncCrawler(transport=httpx.MockTransport(series_handler)).crawl(models.ManhwaBookmark.objects.all())
+        self.assertEqual(requested_paths, ['/series/foo/12'])
+        bookmark.refresh_from_db()
+        self.assertEqual(bookmark.url, 'https://example.com/series/foo/12#top')
+        self.assertEqual(bookmark.title, 'Chapter 12')
+        self.assertEqual(bookmark.main_page_hash, bookmark.chapter_page_hash)
+
+
+class TestMainPageRefresh(BookmarkFixturesMixin, TestCase):
+    def crawl(self, requested_paths: list[str]) -> None:
+        def counting_handler(request: httpx.Request) -> httpx.Response:
+            requested_paths.append(request.url.path)
+            response = handler(request)
+            # a different chapter page every time, so it's never skipped as unchanged
+            return httpx.Response(200, content=response.content + str(len(requested_paths)).encode())
+
+        models.ManhwaBookmark.objects.update(next_chapter_url=None)
+        crawler.AsyncCrawler(transport=httpx.MockTransport(counting_handler)).crawl(
+            models.ManhwaBookmark.objects.all())
+
+    def test_main_page_is_refreshed_when_chapter_page_is_unchanged(self):
+        requested_paths: list[str] = []
+
+        def series_handler(request: httpx.Request) -> httpx.Response:
+            requested_paths.append(request.url.path)
+            if request.url.path == '/series/foo':
+                # the series got a new title, its chapter page didn't change
+                return httpx.Response(200, content=SERIES_PAGE.replace(b'Foo', b'Foo %d' % len(requested_paths)))
+            return handler(request)
+
+        bookmark = self.create_bookmark(12)
+        transport = httpx.MockTransport(series_handler)
+        crawler.AsyncCrawler(transport=transport).crawl(models.ManhwaBookmark.objects.all())
+        expired = timezone.now() - timedelta(seconds=app_settings.MAIN_PAGE_TTL + 1)
+        models.ManhwaBookmark.objects.update(next_chapter_url=None, main_page_checked_at=expired)
+        crawler.AsyncCrawler(transport=transport).crawl(models.ManhwaBookmark.objects.all())
+        self.assertEqual(requested_paths, ['/series/foo/12', '/series/foo', '/series/foo/12', '/series/foo'])
+        bookmark.refresh_from_db()
+        self.assertEqual(bookmark.title, 'Foo 4')
+        self.assertGreater(bookmark.main_page_checked_at, expired)
+        # the chapter page wasn't parsed, the fields read from it are left as they were
+        self.assertIsNone(bookmark.next_chapter_url)
+
+    def test_main_page_is_fetched_once_per_ttl(self):
+        bookmark = self.create_bookmark(12)
+        requested_paths: list[str] = []
+        self.crawl(requested_paths)
+        self.assertEqual(requested_paths, ['/series/foo/12', '/series/foo'])
+        self.crawl(requested_paths)
+        self.assertEqual(requested_paths[2:], ['/series/foo/12'])
+        bookmark.refresh_from_db()
+        self.assertEqual(bookmark.title, 'Foo')
+
+        with self.settings(MANHWABOOKMARKS_MAIN_PAGE_TTL=0):
+            self.crawl(requested_paths)
+        self.assertEqual(requested_paths[3:], ['/series/foo/12', '/series/foo'])
+
+
+class TestBulkWriter(BookmarkFixturesMixin, TestCase):
+    def test_changed_bookmarks_are_written_in_batches(self):
+        def series_handler(request: httpx.Request) -> httpx.Response:
+            # every bookmark is a different series: /<series>/12
+            series = request.url.path.split('/')[1]
+            content = CHAPTER_PAGE.replace(b'/series/foo', f'/{series}'.encode())
+            if request.url.path.count('/') == 1:
+                content = SERIES_PAGE
+            return httpx.Response(200, content=content)
+
+        for series in ('foo', 'bar', 'baz'):
+            self.create_bookmark(12, name=series, chapter_url=f'https://example.com/{series}/12')
+        # one select for the bookmarks and one update per batch, inside a savepoint in the test transaction
+        with self.assertNumQueries(7):
+            stats = crawler.AsyncCrawler(transport=httpx.MockTransport(series_handler), batch_size=2).crawl(
+                models.ManhwaBookmark.objects.all())
+        self.assertEqual(stats.updated, 3)
+        self.assertEqual(
+            list(models.ManhwaBookmark.objects.order_by('pk').values_list('next_chapter_url', 'priority', 'title')),
+            [
+                ('https://example.com/foo/13', 1, 'Foo'),
+                ('https://example.com/bar/13', 1, 'Foo'),
+                ('https://example.com/baz/13', 1, 'Foo'),
+            ])
+
+    def test_unchanged_bookmarks_only_write_the_next_check(self):
+        bookmark = self.create_bookmark(12)
+        writer = crawler.BulkWriter()
+        self.assertFalse(writer.add(bookmark, crawler.ExtractorResult()))
+        self.assertEqual(writer.take_batch(force=True), [(bookmark, set(models.ManhwaBookmark.schedule_fields))])
+
+    def test_conflicting_bookmark_fails_alone(self):
+        def series_handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.count('/') == 1:
+                return httpx.Response(200, content=SERIES_PAGE)
+            # foo and bar link to the same next chapter
+            series = request.url.path.split('/')[1].replace('bar', 'foo')
+            return httpx.Response(200, content=CHAPTER_PAGE.replace(b'/series/foo', f'/{series}'.encode()))
+
+        for series in ('foo', 'bar', 'baz'):
+            self.create_bookmark(12, name=series, chapter_url=f'https://example.com/{series}/12')
+        with self.assertLogs('djmanhwabookmarks.crawler', 'WARNING'):
+            stats = crawler.AsyncCrawler(transport=httpx.MockTransport(series_handler), batch_size=3).crawl(
+                models.ManhwaBookmark.objects.all())
+        self.assertEqual((stats.processed, stats.updated, stats.errors), (2, 2, 1))
+        # the first of foo and bar to be written keeps the next chapter
+        self.assertEqual(
+            sorted(models.ManhwaBookmark.objects.values_list('next_chapter_url', flat=True), key=str),
+            [None, 'https://example.com/baz/13', 'https://example.com/foo/13'])
+
+        # the conflicting bookmark backs off instead of failing again in the next sweep
+        failed = models.ManhwaBookmark.objects.get(next_chapter_url=None)
+        self.assertEqual(failed.unchanged_checks, 1)
+        self.assertIsNone(failed.next_chapter_detected_at)
+        self.assertGreater(failed.next_check_at, timezone.now())
+        stats = crawler.AsyncCrawler(transport=httpx.MockTransport(series_handler)).crawl(
+            models.ManhwaBookmark.objects.due_for_check())
+        self.assertEqual((stats.total, stats.errors), (0, 0))
+
+    def test_unchanged_sweep_reports_no_updates(self):
+        self.create_bookmark(12)
+        transport = httpx.MockTransport(handler)
+        first = crawler.AsyncCrawler(transport=transport).crawl(models.ManhwaBookmark.objects.all())
+        self.assertEqual(first.updated, 1)
+        # the pages didn't change, only the next check is written
+        second = crawler.AsyncCrawler(transport=transport).crawl(models.ManhwaBookmark.objects.all())
+        self.assertEqual((second.processed, second.updated), (1, 0))
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_extractors
+------------
+
+Tests for `dj-manhwabookmarks` extractors module.
+"""
+
+from unittest import mock
+from concurrent.futures import ProcessPoolExecutor
+
+from django.test import SimpleTestCase
+
+from djmanhwabookmarks import caches, extractors
+
+
+class TestPlayWrightReadiness(SimpleTestCase):
+    def get_backend(self, attached: set[str]) -> extractors.PlayWrightExtractorBackend:
+        def locator(selector):
+            result = mock.Mock()
+            result.count.return_value = int(selector in attached)
+            if selector not in attached:
+                result.first.wait_for.side_effect = extractors.PlaywrightTimeoutError('timeout')
+            return result
+
+        backend = extractors.PlayWrightExtractorBackend(ready_timeout=1)
+        backend.page = mock.Mock()
+        backend.page.locator.side_effect = locator
+        return backend
+
+    def test_ready_when_every_selector_is_attached(self):
+        backend = self.get_backend({'.chapter', 'a.next'})
+        backend.open('https://example.com/1', wait_selectors=['.chapter', 'a.next', ''])
+        backend.page.goto.assert_called_once_with('https://example.com/1')
+        backend.page.wait_for_load_state.assert_not_called()
+
+    def test_network_idle_when_optional_selector_is_missing(self):
+        backend = self.get_backend({'.chapter'})
+        backend.open('https://example.com/1', wait_selectors=['.chapter', 'a.next'])
+        backend.page.wait_for_load_state.assert_called_once()
+        self.assertEqual(backend.page.wait_for_load_state.call_args.args, ('networkidle',))
+
+    def test_readiness_is_recorded(self):
+        extractors.readiness_stats.clear()
+        self.get_backend(set()).open('https://slow.com/1', wait_selectors=['.chapter'])
+        readiness = extractors.readiness_stats.hosts()['slow.com']
+        self.assertEqual(readiness.waits, 1)
+        self.assertEqual(readiness.timeouts, 1)
+
+
+class TestPlayWrightResourceBlocking(SimpleTestCase):
+    def route(self, resource_type: str) -> mock.Mock:
+        route = mock.Mock()
+        route.request.resource_type = resource_type
+        return route
+
+    def test_blocks_resources_not_allowed(self):
+        extractors.resource_blocking_stats.clear()
+        backend = extractors.PlayWrightExtractorBackend(
+            blocked_resource_types=extractors.PlayWrightExtractorBackend.BLOCKED_RESOURCE_TYPES - {'stylesheet'})
+        image, stylesheet, document = self.route('image'), self.route('stylesheet'), self.route('document')
+        for route in (image, stylesheet, document):
+            backend._route_request(route)
+        image.abort.assert_called_once()
+        stylesheet.continue_.assert_called_once()
+        document.continue_.assert_called_once()
+        self.assertEqual(extractors.resource_blocking_stats.blocked(), {'image': 1})
+        self.assertEqual(extractors.resource_blocking_stats.estimated_bytes_saved(), 300_000)
+
+
+class TestLXmlXpathExtractorBackend(SimpleTestCase):
+    page = b'''
+    <html><body>
+    <h1> Foo </h1>
+    <span class="chapter">Chapter 12</span>
+    <a class="next" href="/series/foo/13">Next</a>
+    </body></html>
+    '''
+
+    def setUp(self):
+        self.backend = extractors.LXmlXpathExtractorBackend()
+        self.backend.load(self.page)
+
+    def test_css_selectors(self):
+        self.assertEqual(self.backend.get_text_content('h1'), 'Foo')
+        self.assertEqual(self.backend.get_attribute('a.next', 'href', required_tag='a'), '/series/foo/13')
+        self.assertIsNone(self.backend.get_attribute('span.chapter', 'href', required_tag='a'))
+        self.assertIsNone(self.backend.get_text_content('div.missing'))
+
+    def test_xpath_selectors(self):
+        self.assertEqual(self.backend.get_text_content('//span[@class="chapter"]'), 'Chapter 12')
+        self.assertEqual(self.backend.get_text_content('//h1/text()'), 'Foo')
+        self.assertEqual(self.backend.get_attribute('//a[@class="next"]', 'href', required_tag='a'), '/series/foo/13')
+
+    def test_validate_selector_syntax(self):
+        self.backend.validate_selector_syntax('div > a.next')
+        self.backend.validate_selector_syntax('//div/a[1]')
+        with self.assertRaises(extractors.ValidationError):
+            self.backend.validate_selector_syntax('div >> [')
+        with self.assertRaises(extractors.ValidationError):
+            self.backend.validate_selector_syntax('//div[')
+
+
+class TestProcessPoolParsing(SimpleTestCase):
+    page = b'''
+    <html><body>
+    <span class="chapter">Chapter 12</span>
+    <a class="series" href="/series/foo">Foo</a>
+    <a class="next" href="/series/foo/13">Next</a>
+    </body></html>
+    '''
+    params = extractors.ExtractorParams(
+        chapter_url='https://example.com/series/foo/12',
+        chapter_number_selector='span.chapter',
+        chapter_number_regex=r'(\d+)',
+        next_chapter_url_selector='a.next',
+        url_selector='a.series',
+        title_selector='h1',
+        description_selector='div.summary',
+    )
+
+    def test_parse_chapter_page_in_worker_process(self):
+        for backend_class in (extractors.MechanicalSoupExtractorBackend, extractors.LXmlXpathExtractorBackend):
+            with self.subTest(backend_class=backend_class.__name__), ProcessPoolExecutor(1) as executor:
+                result = executor.submit(extractors.parse_chapter_page, backend_class, self.params, self.page).result()
+                self.assertEqual(result.chapter_number, 12)
+                self.assertEqual(result.next_chapter_url, 'https://example.com/series/foo/13')
+                self.assertEqual(result.url, 'https://example.com/series/foo')
+
+
+class TestCompiledCaches(SimpleTestCase):
+    def test_patterns_are_compiled_once(self):
+        caches.clear_caches()
+        backend = extractors.MechanicalSoupExtractorBackend()
+        params = extractors.ExtractorParams(
+            chapter_url='https://example.com/1', chapter_number_selector='span.chapter',
+            chapter_number_regex=r'(\d+)', next_chapter_url_selector='', url_selector='',
+            title_selector='', description_selector='')
+        extractor = extractors.SimpleExtractor(backend, params)
+        for _ in range(3):
+            # every page is a new document, only the compiled patterns are shared
+            backend.load(b'<html><body><span class="chapter">Chapter 12</span></body></html>')
+            self.assertEqual(extractor._get_chapter_number(), 12)
+        stats = caches.cache_stats()
+        self.assertEqual((stats['css'].hits, stats['css'].misses), (2, 1))
+        self.assertEqual((stats['regex'].hits, stats['regex'].misses), (2, 1))
+
+
+class TestGetMany(SimpleTestCase):
+    content = b'''<html><body>
+    <nav><a class="series" href="/series/foo">Foo</a></nav>
+    <h1>Foo</h1><div class="summary">A manhwa about foo.</div>
+    <span class="chapter">Chapter 12</span><a class="next" href="/series/foo/13">Next</a>
+    </body></html>'''
+    selectors = ['span.chapter', 'a.next', 'nav > a', 'h1', 'div.missing', '']
+
+    def test_matches_equal_single_lookups(self):
+        for backend_class in (extractors.MechanicalSoupExtractorBackend, extractors.LXmlXpathExtractorBackend):
+            with self.subTest(backend=backend_class.__name__):
+                batched, single = backend_class(), backend_class()
+                batched.load(self.content)
+                single.load(self.content)
+                matches = batched.get_many(self.selectors)
+                self.assertEqual(list(matches), self.selectors[:-1])
+                self.assertIsNone(matches['div.missing'])
+                for selector in self.selectors[:-1]:
+                    self.assertEqual(batched.get_text_content(selector), single.get_text_content(selector))
+                self.assertEqual(batched.get_attribute('a.next', 'href', required_tag='a'), '/series/foo/13')
+
+    def test_matches_are_reused(self):
+        backend = extractors.MechanicalSoupExtractorBackend()
+        backend.load(self.content)
+        backend.get_many(self.selectors)
+        with mock.patch.object(extractors, 'compile_css') as compile_css:
+            self.assertEqual(backend.get_text_content('h1'), 'Foo')
+            self.assertIsNone(backend.get_text_content('div.missing'))
+        compile_css.assert_not_called()
+        # a new page drops the matches
+        backend.load(b'<html><body><h1>Bar</h1></body></html>')
+        self.assertEqual(backend.get_text_content('h1'), 'Bar')
+
+
+class TestResponseCache(SimpleTestCase):
+    def response(self, content: bytes = b'', status_code: int = 200) -> mock.Mock:
+        return mock.Mock(status_code=status_code, content=content)
+
+    def test_normalize_url(self):
+        self.assertEqual(caches.normalize_url('HTTPS://Example.com:443/a?b=1#c'), 'https://example.com/a?b=1')
+        self.assertEqual(caches.normalize_url('http://example.com'), 'http://example.com/')
+        self.assertEqual(caches.normalize_url('http://example.com:8000/a'), 'http://example.com:8000/a')
+
+    def test_responses_are_only_kept_during_a_sweep(self):
+        cache = caches.ResponseCache(maxsize=2)
+        cache.put('https://example.com/1', self.response())
+        self.assertIsNone(cache.get('https://example.com/1'))
+        with cache.sweep():
+            first, second, third = self.response(b'1'), self.response(b'2'), self.response(b'3')
+            cache.put('https://example.com/1', first)
+            cache.put('https://example.com/2', second)
+            cache.put('https://example.com/3', self.response(status_code=304))
+            self.assertIs(cache.get('https://example.com/1#top'), first)
+            self.assertIsNone(cache.get('https://example.com/3'))
+            # the least recently used response is dropped
+            cache.put('https://example.com/3', third)
+            self.assertIsNone(cache.get('https://example.com/2'))
+            self.assertIs(cache.get('https://example.com/3'), third)
+            self.assertEqual(cache.cache_info().currsize, 2)
+        self.assertEqual(cache.cache_info().currsize, 0)
+        self.assertEqual(cache.dedup_ratio(), 0.5)
+        self.assertIsNone(cache.get('https://example.com/1'))
+
+    def test_same_page_is_parsed_once(self):
+        content = b'<html><body><h1>Foo</h1><a class="series" href="/foo">Foo</a></body></html>'
+        backend = extractors.LXmlXpathExtractorBackend()
+        response = self.response(content)
+        with mock.patch.object(backend, 'fetch', return_value=(response, extractors.get_page_validators(
+                200, {}, content, None))) as fetch, mock.patch.object(backend, 'load', wraps=backend.load) as load:
+            backend.open('https://example.com/foo')
+            validators = backend.open('https://example.com/foo#summary')
+        self.assertTrue(validators.modified)
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(backend.get_text_content('h1'), 'Foo')
+        # the series page validators match the loaded page
+        self.assertFalse(backend.open('https://example.com/foo', validators).modified)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_indexes
+------------
+
+Checks with EXPLAIN that the hot queries of `dj-manhwabookmarks` use the model indexes.
+"""
+
+import unittest
+from datetime import timedelta
+
+from django.db import OperationalError, connection
+from django.test import TestCase
+from django.utils import timezone
+
+from djmanhwabookmarks import models
+
+
+class IndexesTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        models.ManhwaBookmark.objects.bulk_create(
+            models.ManhwaBookmark(
+                name=f'Foo {number}',
+                chapter_url=f'https://host{number % 20}.com/foo{number}/1',
+                host=f'host{number % 20}.com',
+                next_chapter_url=f'https://host{number % 20}.com/foo{number}/2' if number % 3 else None,
+                is_template=number < 20,
+                priority=number % 5,
+                next_check_at=now + timedelta(hours=number % 48 - 24),
+            )
+            for number in range(1000)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {models.ManhwaBookmark._meta.db_table}')
+
+    def explain(self, queryset) -> str:
+        return queryset.explain()
+
+    def test_ordering_index(self):
+        self.assertIn('manhwabookmark_ordering_idx', self.explain(models.ManhwaBookmark.objects.all()[:50]))
+
+    def test_template_index(self):
+        queryset = models.ManhwaBookmark.objects.filter(host='host1.com', is_template=True)
+        self.assertIn('manhwabookmark_template_idx', self.explain(queryset))
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'SQLite query plans')
+class TestSQLiteIndexes(IndexesTestMixin, TestCase):
+    def explain_indexed_by(self, queryset, index_name: str) -> str:
+        "The plan of `queryset` restricted to `index_name`, sqlite fails when the index cannot serve the query."
+        table = models.ManhwaBookmark._meta.db_table
+        sql, params = queryset.query.sql_with_params()
+        sql = sql.replace(f'FROM "{table}"', f'FROM "{table}" INDEXED BY "{index_name}"', 1)
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+
+    def test_pending_index(self):
+        # the planner prefers the unique index of `next_chapter_url` for `IS NULL`, which would hide a partial
+        # index that doesn't match the query: the pending index is forced, it is the only candidate of the plan
+        queryset = models.ManhwaBookmark.objects.due_for_check()
+        self.assertIn('USING INDEX manhwabookmark_pending_idx', self.explain_indexed_by(queryset,
+            'manhwabookmark_pending_idx'))
+        with self.assertRaisesMessage(OperationalError, 'no query solution'):
+            self.explain_indexed_by(models.ManhwaBookmark.objects.filter(next_chapter_url__isnull=False),
+                'manhwabookmark_pending_idx')
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'PostgreSQL query plans')
+class TestPostgreSQLIndexes(IndexesTestMixin, TestCase):
+    def explain(self, queryset) -> str:
+        # the test tables are small enough for a sequential scan to always win
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def test_pending_index(self):
+        self.assertIn('manhwabookmark_pending_idx', self.explain(models.ManhwaBookmark.objects.due_for_check()))
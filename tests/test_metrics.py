@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_metrics
+------------
+
+Tests for `dj-manhwabookmarks` metrics module.
+"""
+
+import httpx
+
+from django.test import SimpleTestCase, TestCase
+
+from djmanhwabookmarks import crawler, metrics, models, signals
+
+from .test_crawler import CHAPTER_PAGE, SERIES_PAGE, BookmarkFixturesMixin, handler
+
+
+class TestBookmarkTimings(BookmarkFixturesMixin, TestCase):
+    def setUp(self):
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+        self.timed: list[tuple[models.ManhwaBookmark, metrics.BookmarkTimings]] = []
+
+        def receiver(sender, bookmark, timings, **kwargs):
+            self.timed.append((bookmark, timings))
+
+        signals.bookmark_timed.connect(receiver, weak=False, dispatch_uid='test_metrics')
+        self.addCleanup(signals.bookmark_timed.disconnect, dispatch_uid='test_metrics')
+
+    def test_crawl_records_every_phase(self):
+        bookmark = self.create_bookmark(12)
+        crawler.AsyncCrawler(transport=httpx.MockTransport(handler)).crawl(models.ManhwaBookmark.objects.all())
+        [(timed_bookmark, timings)] = self.timed
+        self.assertEqual(timed_bookmark, bookmark)
+        self.assertEqual((timings.host, timings.backend, timings.error), ('example.com', 'mechanical_soup', ''))
+        self.assertEqual(set(timings.phases), {'download', 'parse', 'select', 'compare', 'save'})
+        self.assertEqual(set(timings.selectors), {'span.chapter', 'a.next', 'a.series', 'h1', 'div.summary'})
+        self.assertAlmostEqual(timings.phases['select'], sum(timings.selectors.values()))
+        self.assertEqual((timings.pages, timings.cached_pages), (2, 0))
+        self.assertEqual(timings.bytes_downloaded, len(CHAPTER_PAGE) + len(SERIES_PAGE))
+
+        dump = metrics.registry.to_prometheus()
+        self.assertIn(
+            'djmanhwabookmarks_phase_seconds_count{host="example.com",backend="mechanical_soup",phase="download"} 1',
+            dump)
+        self.assertIn(
+            'djmanhwabookmarks_bookmarks_total{host="example.com",backend="mechanical_soup",outcome="ok"} 1', dump)
+        self.assertIn(f'djmanhwabookmarks_downloaded_bytes_total{{host="example.com",backend="mechanical_soup"}} '
+            f'{len(CHAPTER_PAGE) + len(SERIES_PAGE)}', dump)
+
+    def test_errors_are_recorded(self):
+        def failing_handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError('refused')
+
+        self.create_bookmark(12)
+        crawler.AsyncCrawler(transport=httpx.MockTransport(failing_handler)).crawl(models.ManhwaBookmark.objects.all())
+        [(_, timings)] = self.timed
+        self.assertIn('ConnectError', timings.error)
+        self.assertIn('outcome="error"} 1', metrics.registry.to_prometheus())
+
+    def test_single_update_is_recorded(self):
+        bookmark = self.create_bookmark(12, chapter_url='http://127.0.0.1:1/series/foo/12')
+        with self.assertRaises(Exception):
+            bookmark.update_bookmark()
+        [(_, timings)] = self.timed
+        self.assertEqual(timings.host, '127.0.0.1:1')
+        self.assertTrue(timings.error)
+
+
+class TestMetricsRegistry(SimpleTestCase):
+    def test_prometheus_text(self):
+        registry = metrics.MetricsRegistry()
+        timings = metrics.BookmarkTimings('example.com', 'lxml')
+        timings.phases['parse'] = 0.5
+        timings.selectors['a[title="x"]'] = 0.25
+        timings.add_page(100)
+        timings.add_page(100, cached=True)
+        registry.observe(timings)
+        registry.observe(timings)
+        lines = registry.to_prometheus().splitlines()
+        self.assertIn('# TYPE djmanhwabookmarks_phase_seconds summary', lines)
+        self.assertIn('djmanhwabookmarks_phase_seconds_sum{host="example.com",backend="lxml",phase="parse"} 1.0', lines)
+        self.assertIn('djmanhwabookmarks_phase_seconds_count{host="example.com",backend="lxml",phase="parse"} 2', lines)
+        self.assertIn('djmanhwabookmarks_selector_seconds_sum{host="example.com",selector="a[title=\\"x\\"]"} 0.5', lines)
+        self.assertIn('djmanhwabookmarks_pages_total{host="example.com",backend="lxml",cached="true"} 2', lines)
+        self.assertIn('djmanhwabookmarks_downloaded_bytes_total{host="example.com",backend="lxml"} 200', lines)
+        self.assertIn('Slowest hosts: example.com 1.00s', registry.top())
+
+        totals = registry.totals()
+        other = metrics.BookmarkTimings('other.com', 'lxml')
+        other.phases['parse'] = 0.1
+        registry.observe(other)
+        self.assertEqual(registry.top(since=totals).splitlines(),
+            ['Slowest hosts: other.com 0.10s', 'Slowest selectors: none'])
+
+    def test_phases_outside_an_update_are_ignored(self):
+        with metrics.phase('parse'), metrics.selector('h1'):
+            self.assertIsNone(metrics.current_timings())
+        timings = metrics.BookmarkTimings()
+        with metrics.collect(timings):
+            with metrics.phase('parse'):
+                ...
+        with metrics.phase('parse'):
+            ...
+        self.assertEqual(list(timings.phases), ['parse'])
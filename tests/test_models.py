@@ -8,9 +8,12 @@ test_dj-manhwabookmarks
 Tests for `dj-manhwabookmarks` models module.
 """
 
-from django.test import TestCase
+from datetime import timedelta
 
-from djmanhwabookmarks import models  # noqa F401
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from djmanhwabookmarks import caches, extractors, models
 
 
 class TestDjmanhwabookmarks(TestCase):
@@ -23,3 +26,146 @@ class TestDjmanhwabookmarks(TestCase):
 
     def tearDown(self):
         pass
+
+
+class TestDirtyTracking(TestCase):
+    def create_bookmark(self, number: int) -> models.ManhwaBookmark:
+        return models.ManhwaBookmark.objects.create(
+            name=f'Foo {number}', chapter_url=f'https://example.com/foo/{number}')
+
+    def result(self, number: int) -> extractors.ExtractorResult:
+        return extractors.ExtractorResult(
+            url=f'https://example.com/foo{number}', title=f'Foo {number}', chapter_number=number,
+            next_chapter_url=f'https://example.com/foo/{number + 1}')
+
+    def test_loaded_bookmarks_are_clean(self):
+        self.create_bookmark(1)
+        bookmark = models.ManhwaBookmark.objects.get()
+        self.assertEqual(bookmark.get_dirty_fields(), set())
+        with self.assertNumQueries(0):
+            self.assertFalse(bookmark.is_modified_for_update())
+        bookmark.title = 'Bar'
+        self.assertEqual(bookmark.get_dirty_fields(), {'title'})
+
+    def test_deferred_fields_are_not_dirty(self):
+        self.create_bookmark(1)
+        bookmark = models.ManhwaBookmark.objects.only('pk', 'name', 'title').get()
+        self.assertEqual(bookmark.get_dirty_fields(), set())
+        bookmark.description = 'Bar'
+        self.assertEqual(bookmark.get_dirty_fields(), {'description'})
+
+    def test_sweep_queries(self):
+        for number in range(50):
+            self.create_bookmark(number)
+        bookmarks = list(models.ManhwaBookmark.objects.all())
+        # one UPDATE per modified bookmark, no SELECT to compare
+        with self.assertNumQueries(len(bookmarks)):
+            for bookmark in bookmarks:
+                bookmark.apply_extractor_result(self.result(int(bookmark.name.split()[1])))
+        # nothing changed the second time
+        with self.assertNumQueries(0):
+            for bookmark in bookmarks:
+                bookmark.apply_extractor_result(self.result(int(bookmark.name.split()[1])))
+        bookmark = models.ManhwaBookmark.objects.get(name='Foo 7')
+        self.assertEqual((bookmark.chapter_number, bookmark.title, bookmark.priority), (7, 'Foo 7', 1))
+
+    def test_only_dirty_fields_are_saved(self):
+        bookmark = self.create_bookmark(1)
+        models.ManhwaBookmark.objects.filter(pk=bookmark.pk).update(name='Renamed')
+        bookmark.apply_extractor_result(self.result(1))
+        bookmark.refresh_from_db()
+        self.assertEqual(bookmark.name, 'Renamed')
+        self.assertEqual(bookmark.title, 'Foo 1')
+
+
+class TestUpdateJob(TestCase):
+    def setUp(self):
+        # nothing listens on port 1, the updates fail without waiting
+        self.bookmark = models.ManhwaBookmark.objects.create(name='Foo', chapter_url='http://127.0.0.1:1/foo/1')
+
+    def test_jobs_are_claimed_once(self):
+        job = models.UpdateJob.objects.enqueue(models.ManhwaBookmark.objects.all())
+        self.assertEqual(list(job.bookmarks.all()), [self.bookmark])
+        claimed = models.UpdateJob.objects.claim_next()
+        self.assertEqual(claimed, job)
+        self.assertEqual(claimed.status, models.UpdateJobStatus.RUNNING)
+        self.assertIsNone(models.UpdateJob.objects.claim_next())
+
+    def test_run_stores_the_stats(self):
+        job = models.UpdateJob.objects.enqueue(models.ManhwaBookmark.objects.all())
+        models.UpdateJob.objects.claim_next().run()
+        job.refresh_from_db()
+        self.assertEqual(job.status, models.UpdateJobStatus.DONE)
+        self.assertEqual((job.total, job.processed, job.errors), (1, 0, 1))
+        self.assertEqual(job.progress_percent, 100)
+        self.assertIsNotNone(job.finished_at)
+
+
+@override_settings(MANHWABOOKMARKS_MIN_CHECK_INTERVAL=3600, MANHWABOOKMARKS_MAX_CHECK_INTERVAL=30 * 86400,
+    MANHWABOOKMARKS_CHECKS_PER_RELEASE=4)
+class TestReleaseCadence(TestCase):
+    def test_check_delay(self):
+        bookmark = models.ManhwaBookmark(name='Foo', chapter_url='https://example.com/foo/1')
+        self.assertEqual(bookmark.get_check_delay(), timedelta(hours=1))
+        bookmark.release_interval = timedelta(days=4)
+        self.assertEqual(bookmark.get_check_delay(), timedelta(days=1))
+        # two releases missed, the delay doubles with every check
+        bookmark.unchanged_checks = 10
+        self.assertEqual(bookmark.get_check_delay(), timedelta(days=4))
+        bookmark.unchanged_checks = 100
+        self.assertEqual(bookmark.get_check_delay(), timedelta(days=30))
+
+    def test_release_interval_estimation(self):
+        bookmark = models.ManhwaBookmark(name='Foo', chapter_url='https://example.com/foo/1', unchanged_checks=3)
+        now = timezone.now()
+        bookmark.record_new_chapter(now)
+        self.assertIsNone(bookmark.release_interval)
+        bookmark.record_new_chapter(now + timedelta(days=7))
+        self.assertEqual(bookmark.release_interval, timedelta(days=7))
+        bookmark.record_new_chapter(now + timedelta(days=10))
+        self.assertEqual(bookmark.release_interval, timedelta(days=5))
+        self.assertEqual(bookmark.unchanged_checks, 0)
+
+    def test_due_for_check(self):
+        now = timezone.now()
+        for number, next_check_at in enumerate((None, now - timedelta(hours=1), now + timedelta(hours=1))):
+            models.ManhwaBookmark.objects.create(
+                name=f'Foo {number}', chapter_url=f'https://example.com/foo/{number}', next_check_at=next_check_at)
+        models.ManhwaBookmark.objects.create(name='Bar', chapter_url='https://example.com/bar/1',
+            next_chapter_url='https://example.com/bar/2')
+        self.assertEqual(
+            sorted(models.ManhwaBookmark.objects.due_for_check().values_list('name', flat=True)), ['Foo 0', 'Foo 1'])
+
+
+class TestTemplateCache(TestCase):
+    def setUp(self):
+        caches.template_cache.clear()
+        self.addCleanup(caches.template_cache.clear)
+        self.template = models.ManhwaBookmark.objects.create(
+            name='Example', chapter_url='https://Example.com/template', is_template=True, title_selector='h1')
+
+    def create_bookmark(self, number: int) -> models.ManhwaBookmark:
+        return models.ManhwaBookmark.objects.create(name=f'Foo {number}', chapter_url=f'http://example.com/foo/{number}')
+
+    def test_templates_are_found_by_host(self):
+        self.assertEqual(self.template.host, 'example.com')
+        self.assertEqual(self.create_bookmark(1).title_selector, 'h1')
+        # the templates are loaded once, only the insert is left
+        with self.assertNumQueries(1):
+            self.assertEqual(self.create_bookmark(2).title_selector, 'h1')
+
+    def test_saving_a_template_clears_the_cache(self):
+        self.create_bookmark(1)
+        self.template.title_selector = 'h2'
+        self.template.save()
+        self.assertEqual(self.create_bookmark(2).title_selector, 'h2')
+        self.template.delete()
+        self.assertEqual(self.create_bookmark(3).title_selector, '')
+
+    def test_templates_expire(self):
+        self.create_bookmark(1)
+        # an edit made by another process, the signals of this one aren't sent
+        models.ManhwaBookmark.objects.filter(pk=self.template.pk).update(title_selector='h2')
+        self.assertEqual(self.create_bookmark(2).title_selector, 'h1')
+        with self.settings(MANHWABOOKMARKS_TEMPLATE_CACHE_TTL=0):
+            self.assertEqual(self.create_bookmark(3).title_selector, 'h2')
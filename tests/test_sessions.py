@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_sessions
+------------
+
+Tests for `dj-manhwabookmarks` sessions module.
+"""
+
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from django.test import SimpleTestCase
+
+from djmanhwabookmarks.sessions import SessionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'<html><body><h1>Foo</h1></body></html>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSessionPool(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def test_sessions_are_reused_per_host(self):
+        pool = SessionPool(max_idle_per_host=1)
+        with pool.session(self.url) as first:
+            first.get(self.url)
+        with pool.session(self.url + 'other') as second:
+            second.get(self.url)
+        self.assertIs(first, second)
+        stats = pool.stats()
+        self.assertEqual(stats.sessions_created, 1)
+        self.assertEqual(stats.sessions_reused, 1)
+        self.assertEqual(stats.requests, 2)
+        self.assertEqual(stats.connections_opened, 1)
+        self.assertEqual(stats.connections_reused, 1)
+        pool.clear()
+
+    def test_idle_sessions_are_bounded(self):
+        pool = SessionPool(max_idle_per_host=1)
+        with pool.session(self.url) as first, pool.session(self.url) as second:
+            first.get(self.url)
+            second.get(self.url)
+        self.assertIsNot(first, second)
+        stats = pool.stats()
+        self.assertEqual(stats.sessions_created, 2)
+        # the session returned last is closed, but its counters are kept
+        self.assertEqual(stats.requests, 2)
+        self.assertEqual(stats.connections_opened, 2)
+        pool.clear()